@@ -0,0 +1,378 @@
+"""
+番剧重命名性能测试工具
+
+生成模拟的字幕组文件名目录，启动本地的OpenAI兼容接口返回录制或规则生成的结果，
+统计遍历、构建提示词、等待模型、解析和重命名各阶段耗时，以及每个文件的token数和调用次数。
+不需要网络。
+"""
+import os
+import re
+import ast
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from functools import wraps
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import src
+from compress import expand_response
+
+GROUPS = ['ANi', 'Prejudice-Studio', 'DBD-Raws', 'Nekomoe kissaten', 'LoliHouse', 'Sakurato', 'SweetSub', 'VCB-Studio']
+TITLES = [
+    '轉生成貓咪的大叔', '終末起點', 'Re Zero kara Hajimeru Isekai Seikatsu', 'Sousou no Frieren',
+    '葬送的芙莉莲', 'Kusuriya no Hitorigoto', '药屋少女的呢喃', 'Dungeon Meshi', '迷宫饭',
+    'Bocchi the Rock!', '孤独摇滚', 'Oshi no Ko', '我推的孩子', 'Spy x Family', '间谍过家家',
+]
+VIDEO_TEMPLATES = [
+    '[{group}] {title} - {ep:02d} [1080P][Baha][WEB-DL][AAC AVC][CHT].mp4',
+    '[{group}][{title}][{ep:02d}][WEB-DL_1080P_x264_AAC][简日双语].mp4',
+    '[{group}] {title} - {ep:02d} [WEBDL 1080P AVC 8bit AAC MP4][繁体内挂].mp4',
+    '[{group}] {title} - {ep:02d} (BDRip 1920x1080 HEVC-10bit FLAC).mkv',
+    '[{group}][{title}][{ep:02d}][720P][WebRip][GB].mkv',
+]
+SUBTITLE_TEMPLATES = [
+    '{title}{ep}.ass',
+    '[{group}] {title} - {ep:02d}.sc.ass',
+    '[{group}][{title}][{ep:02d}].chs.srt',
+]
+
+
+def generate_corpus(directory: str, file_count: int, seed: int = 0) -> int:
+    """
+    在目录下生成空的番剧文件，按 番剧名/Season N 分文件夹
+    大约三分之一的视频带有外挂字幕，返回实际生成的文件数
+    """
+    rng = random.Random(seed)
+    created = 0
+    series_index = 0
+    while created < file_count:
+        title = TITLES[series_index % len(TITLES)]
+        if series_index >= len(TITLES):
+            title = f'{title} {series_index // len(TITLES) + 1}'
+        group = rng.choice(GROUPS)
+        video_template = rng.choice(VIDEO_TEMPLATES)
+        subtitle_template = rng.choice(SUBTITLE_TEMPLATES)
+        for season in range(1, rng.randint(1, 3) + 1):
+            season_dir = os.path.join(directory, title, f'Season {season}')
+            os.makedirs(season_dir, exist_ok=True)
+            for ep in range(1, rng.choice([12, 13, 24, 25]) + 1):
+                if created >= file_count:
+                    return created
+                Path(season_dir, video_template.format(group=group, title=title, ep=ep)).touch()
+                created += 1
+                if created < file_count and rng.random() < 0.35:
+                    Path(season_dir, subtitle_template.format(group=group, title=title, ep=ep)).touch()
+                    created += 1
+        series_index += 1
+    return created
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计token数：中日文字符按1个计算，其他字符按4个一个计算"""
+    cjk = sum(1 for ch in text if ord(ch) > 0x2E80)
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+SEASON_PATTERN = re.compile(r'Season (\d+)')
+RESOLUTION_PATTERN = re.compile(r'(2160|1080|720|480)[pP]')
+SOURCE_PATTERN = re.compile(r'(WEB-DL|WEBDL|WebRip|BDRip)', re.IGNORECASE)
+
+
+def _parse_name(rel_path: str) -> tuple[str, int, int, str]:
+    """从模拟文件名中解析出 (番剧名, 季, 集, 额外信息)"""
+    season_match = SEASON_PATTERN.search(rel_path)
+    season = int(season_match.group(1)) if season_match else 1
+    name = os.path.splitext(os.path.basename(rel_path))[0]
+    name = re.sub(r'\.(sc|chs)$', '', name)
+    name = re.sub(r'^\[[^\]]+\]\s*', '', name)
+    if name.startswith('['):
+        parts = re.findall(r'\[([^\]]+)\]', name)
+        title, ep = parts[0], int(parts[1])
+    elif ' - ' in name:
+        title, rest = name.split(' - ', 1)
+        ep = int(re.match(r'\d+', rest).group())
+    else:
+        match = re.match(r'(.*?)(\d+)$', name)
+        title, ep = match.group(1), int(match.group(2))
+    extra = []
+    resolution = RESOLUTION_PATTERN.search(name)
+    if resolution:
+        extra.append(resolution.group(1) + 'P')
+    source = SOURCE_PATTERN.search(name)
+    if source:
+        extra.append(source.group(1))
+    return title.strip(), season, ep, '.'.join(extra)
+
+
+def rule_response(video_name_list: list, subtitle_name_list: list) -> str:
+    """按规则生成与模型相同格式的重命名结果"""
+    results = []
+    video_names = {}
+    for rel_path in video_name_list:
+        title, season, ep, extra = _parse_name(rel_path)
+        base = f'{title} - S{season:02d}E{ep:02d}' + (f' - {extra}' if extra else '')
+        video_names[(title, season, ep)] = base
+        results.append({'文件名': rel_path, '重命名': base + os.path.splitext(rel_path)[1], '置信度': 0.95})
+    for rel_path in subtitle_name_list:
+        title, season, ep, _ = _parse_name(rel_path)
+        base = video_names.get((title, season, ep), f'{title} - S{season:02d}E{ep:02d}')
+        results.append({'文件名': rel_path, '重命名': base + os.path.splitext(rel_path)[1], '置信度': 0.9})
+    return json.dumps(results, ensure_ascii=False)
+
+
+TEMPLATE_LINE_PATTERN = re.compile(r'^(T\d+) = (".*") 取值: (\S+)')
+
+
+def _expand_values(values: str) -> list:
+    """展开 01-12,14 形式的取值"""
+    expanded = []
+    for part in values.split(','):
+        start, _, end = part.partition('-')
+        if end and start.isdigit() and end.isdigit():
+            expanded.extend(str(i).zfill(len(start)) for i in range(int(start), int(end) + 1))
+        else:
+            expanded.append(part)
+    return [tuple(value.split('|')) for value in expanded]
+
+
+def template_response(template_id: str, template: str, values: list, is_video: bool) -> list:
+    """
+    按规则生成一个模板的回复
+    只有一个变化部分且它就是集数时返回一条新文件名模板，否则逐个文件返回
+    """
+    names = [template.format(*value) for value in values]
+    video_list, subtitle_list = (names, []) if is_video else ([], names)
+    results = json.loads(rule_response(video_list, subtitle_list))
+    if all(len(value) == 1 and value[0].isdigit() for value in values):
+        first_ep = int(values[0][0])
+        answer = {'模板': template_id, '重命名': results[0]['重命名'].replace(f'E{first_ep:02d}', 'E{0:02d}', 1), '置信度': 0.95}
+        expanded, _ = expand_response([answer], {template_id: {'names': names, 'values': values}})
+        if [item['重命名'] for item in expanded] == [item['重命名'] for item in results]:
+            return [answer]
+    return results
+
+
+def _parse_user_prompt(content: str) -> tuple[list, list, list]:
+    """从提示词中取出视频和字幕文件列表，以及 (模板编号, 模板, 取值, 是否视频) 列表"""
+    lists = {}
+    templates = []
+    is_video = True
+    for line in content.splitlines():
+        line = line.strip()
+        key, _, value = line.partition(': ')
+        if key in ('视频文件列表', '字幕文件列表'):
+            lists[key] = ast.literal_eval(value)
+        elif line in ('视频文件模板:', '字幕文件模板:'):
+            is_video = line == '视频文件模板:'
+        else:
+            match = TEMPLATE_LINE_PATTERN.match(line)
+            if match:
+                templates.append((match.group(1), json.loads(match.group(2)),
+                                  _expand_values(match.group(3)), is_video))
+    return lists.get('视频文件列表', []), lists.get('字幕文件列表', []), templates
+
+
+class MockLLMServer:
+    """
+    本地OpenAI兼容的 /v1/chat/completions 接口
+    优先返回录制的结果（按用户提示词的sha256查找），否则按规则生成，可设置固定延迟
+    """
+
+    def __init__(self, latency: float = 0.0, responses: dict = None):
+        self.latency = latency
+        self.responses = responses or {}
+        self.lock = threading.Lock()
+        self.reset_stats()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                payload = json.dumps(server.complete(body), ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f'http://127.0.0.1:{self.httpd.server_address[1]}/v1'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats = {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def complete(self, body: dict) -> dict:
+        messages = body.get('messages', [])
+        user_content = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), '')
+        key = hashlib.sha256(user_content.encode('utf-8')).hexdigest()
+        if key in self.responses:
+            content = self.responses[key]
+        else:
+            video_list, subtitle_list, templates = _parse_user_prompt(user_content)
+            results = json.loads(rule_response(video_list, subtitle_list))
+            for template in templates:
+                results.extend(template_response(*template))
+            content = json.dumps(results, ensure_ascii=False)
+        if self.latency:
+            time.sleep(self.latency)
+
+        prompt_tokens = sum(estimate_tokens(m['content']) for m in messages)
+        completion_tokens = estimate_tokens(content)
+        with self.lock:
+            self.stats['calls'] += 1
+            self.stats['prompt_tokens'] += prompt_tokens
+            self.stats['completion_tokens'] += completion_tokens
+        return {
+            'id': f'chatcmpl-{key[:12]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'mock'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        }
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class PhaseTimer:
+    """累计被包装函数的耗时"""
+
+    def __init__(self):
+        self.totals = {}
+
+    def wrap(self, phase: str, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.totals[phase] = self.totals.get(phase, 0.0) + time.perf_counter() - start
+        return wrapper
+
+
+def run_once(directory: str, server: MockLLMServer, workers: int, probe: bool, compress: bool = True) -> dict:
+    """对一个目录执行一次完整的重命名流程并统计各阶段耗时"""
+    timer = PhaseTimer()
+    server.reset_stats()
+    phases = {}
+
+    # 包装模块函数，统计提示词构建和等待模型的耗时
+    original = src.build_messages, src.request_completion
+    src.build_messages = timer.wrap('prompt', src.build_messages)
+    src.request_completion = timer.wrap('wait', src.request_completion)
+    try:
+        start = time.perf_counter()
+        video_files, subtitle_files = src.get_all_files(directory)
+        phases['walk'] = time.perf_counter() - start
+
+        media_info = None
+        if probe:
+            start = time.perf_counter()
+            media_info = src.probe_media(directory, video_files, workers)
+            phases['probe'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rename_plan, conflicts = src.plan_renames(video_files, subtitle_files, media_info, compress)
+        plan_time = time.perf_counter() - start
+    finally:
+        src.build_messages, src.request_completion = original
+
+    phases['prompt'] = timer.totals.get('prompt', 0.0)
+    phases['wait'] = timer.totals.get('wait', 0.0)
+    phases['parse'] = max(0.0, plan_time - phases['prompt'] - phases['wait'])
+
+    start = time.perf_counter()
+    ok = src.execute_rename_plan(rename_plan, os.path.join(directory, src.JOURNAL_NAME), workers, verbose=False)
+    phases['rename'] = time.perf_counter() - start
+
+    file_count = len(video_files) + len(subtitle_files)
+    stats = dict(server.stats)
+    return {
+        'files': file_count,
+        'videos': len(video_files),
+        'subtitles': len(subtitle_files),
+        'renamed': len(rename_plan) if ok else 0,
+        'conflicts': len(conflicts),
+        'phases': {phase: round(seconds, 4) for phase, seconds in phases.items()},
+        'total': round(sum(phases.values()), 4),
+        'llm_calls': stats['calls'],
+        'prompt_tokens': stats['prompt_tokens'],
+        'completion_tokens': stats['completion_tokens'],
+        'tokens_per_file': round((stats['prompt_tokens'] + stats['completion_tokens']) / max(file_count, 1), 2),
+        'calls_per_file': round(stats['calls'] / max(file_count, 1), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='番剧重命名性能测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000], help='测试的文件数量')
+    parser.add_argument('--latency', type=float, default=0.0, help='模拟接口每次调用的延迟秒数')
+    parser.add_argument('--responses', help='录制的回复文件，JSON格式：{用户提示词sha256: 回复内容}')
+    parser.add_argument('--workers', type=int, default=8, help='并行重命名的目录数')
+    parser.add_argument('--probe', action='store_true', help='同时测试媒体信息探测')
+    parser.add_argument('--no-compress', action='store_true', help='不合并相似文件名，用于对比')
+    parser.add_argument('--seed', type=int, default=0, help='生成文件名的随机种子')
+    parser.add_argument('--output', help='结果输出文件，默认输出到标准输出')
+    args = parser.parse_args()
+
+    responses = {}
+    if args.responses:
+        with open(args.responses, 'r', encoding='utf-8') as f:
+            responses = json.load(f)
+
+    results = []
+    with MockLLMServer(args.latency, responses) as server:
+        os.environ['OPENAI_API_KEY'] = 'mock'
+        os.environ['OPENAI_BASE_URL'] = server.base_url
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                generate_corpus(directory, size, args.seed)
+                result = run_once(directory, server, args.workers, args.probe, not args.no_compress)
+            print(f"{size} 个文件: 总耗时 {result['total']:.3f}s, "
+                  f"每个文件 {result['tokens_per_file']} tokens", file=sys.stderr)
+            results.append(result)
+
+    report = json.dumps({
+        'config': {'latency': args.latency, 'workers': args.workers, 'probe': args.probe,
+                   'compress': not args.no_compress, 'seed': args.seed},
+        'results': results,
+    }, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import re
+import posixpath
+from collections import defaultdict
+
+# 文件名中的数字部分，合并模板时作为可能变化的位置
+DIGITS_PATTERN = re.compile(r'\d+')
+
+COMPRESS_RULE = """
+        9. 文件名相似的文件会合并为模板，如 T1 = "目录/[字幕组] 番剧 - {0} [1080P].mp4" 取值: 01-24，{0}、{1}表示变化的部分，
+           取值中用逗号分隔每个文件，有多个变化部分时用|分隔，连续的数字写成01-24。
+           每个模板只需返回一条结果：{"模板":"T1","重命名":"番剧 - S01E{0:02d} - 1080P.mp4","置信度":0.9}，
+           新文件名模板中用{0}、{1}引用取值，数字取值可以写格式如{0:02d}。
+           同一模板中的文件不能用同一规则命名时，对这些文件按展开后的文件名单独返回。
+"""
+
+
+class _Value(str):
+    """模板取值，数字取值支持 {0:02d} 这类整数格式"""
+
+    def __format__(self, spec: str) -> str:
+        if spec.endswith('d') and self.isdigit():
+            return format(int(self), spec)
+        return str.__format__(self, spec)
+
+
+def _escape(text: str) -> str:
+    return text.replace('{', '{{').replace('}', '}}')
+
+
+def _compress_values(values: list) -> str:
+    """将取值列表写成紧凑形式，单个变化部分的连续数字写成 01-24"""
+    if all(len(value) == 1 for value in values):
+        singles = [value[0] for value in values]
+        if all(v.isdigit() for v in singles):
+            parts = []
+            start = prev = None
+            for v in singles:
+                if prev is not None and int(v) == int(prev) + 1 and len(v) == len(prev):
+                    prev = v
+                    continue
+                if start is not None:
+                    parts.append(start if start == prev else f'{start}-{prev}')
+                start = prev = v
+            parts.append(start if start == prev else f'{start}-{prev}')
+            return ','.join(parts)
+    return ','.join('|'.join(value) for value in values)
+
+
+def group_names(names: list, media_info: dict = None) -> tuple[list, list]:
+    """
+    按目录、去掉数字后的文件名形状和媒体信息分组，组内变化的数字作为模板的取值
+    返回 (模板列表, 没有合并的文件名列表)
+    每个模板为 {'template': 带{0}占位符的相对路径, 'values': 取值元组列表, 'names': 对应的文件名列表, 'media': 媒体信息}
+    """
+    media_info = media_info or {}
+    groups = defaultdict(list)
+    for name in names:
+        directory, basename = posixpath.split(name)
+        shape = DIGITS_PATTERN.sub('#', basename)
+        groups[(directory, shape, media_info.get(name, ''))].append(name)
+
+    templates = []
+    singles = []
+    for (directory, _, media), group in groups.items():
+        if len(group) < 2:
+            singles.extend(group)
+            continue
+
+        group.sort(key=lambda n: [int(d) for d in DIGITS_PATTERN.findall(posixpath.basename(n))])
+        pieces = [DIGITS_PATTERN.split(posixpath.basename(n)) for n in group]
+        numbers = [DIGITS_PATTERN.findall(posixpath.basename(n)) for n in group]
+        varying = [i for i in range(len(numbers[0])) if len({nums[i] for nums in numbers}) > 1]
+
+        parts = []
+        for i, text in enumerate(pieces[0]):
+            parts.append(_escape(text))
+            if i < len(numbers[0]):
+                if i in varying:
+                    parts.append('{%d}' % varying.index(i))
+                else:
+                    parts.append(numbers[0][i])
+        basename_template = ''.join(parts)
+        templates.append({
+            'template': posixpath.join(_escape(directory), basename_template) if directory else basename_template,
+            'values': [tuple(nums[i] for i in varying) for nums in numbers],
+            'names': group,
+            'media': media,
+        })
+    return templates, singles
+
+
+def build_compressed_prompt(video_name_list: list, subtitle_name_list: list,
+                            media_info: dict = None) -> tuple[str, dict]:
+    """
+    构建合并模板后的用户提示词
+    返回 (用户提示词, 模板编号 -> 模板)，用于展开模型的回复
+    """
+    media_info = media_info or {}
+    video_templates, video_singles = group_names(video_name_list, media_info)
+    subtitle_templates, subtitle_singles = group_names(subtitle_name_list)
+
+    template_map = {}
+    lines = []
+    for title, templates in (('视频文件模板', video_templates), ('字幕文件模板', subtitle_templates)):
+        if not templates:
+            continue
+        lines.append(f'{title}:')
+        for template in templates:
+            template_id = f'T{len(template_map) + 1}'
+            template_map[template_id] = template
+            line = f'{template_id} = "{template["template"]}" 取值: {_compress_values(template["values"])}'
+            if template['media']:
+                line += f' 媒体信息: {template["media"]}'
+            lines.append(line)
+
+    if video_singles:
+        lines.append(f'视频文件列表: {video_singles}')
+    if subtitle_singles:
+        lines.append(f'字幕文件列表: {subtitle_singles}')
+    single_media = {name: media_info[name] for name in video_singles if name in media_info}
+    if single_media:
+        lines.append(f'媒体信息: {single_media}')
+    return '\n'.join(lines) + '\n', template_map
+
+
+def expand_response(rename_info_list: list, template_map: dict) -> tuple[list, list]:
+    """
+    将模板形式的回复展开为每个文件一条的 {"文件名","重命名","置信度"} 列表
+    单独返回的文件优先于所属模板
+    返回 (展开后的列表, 没有得到结果的文件列表)，后者为 (文件名, 新文件名模板, 原因)
+    """
+    expanded = [info for info in rename_info_list if '模板' not in info]
+    answered = {info.get('文件名') for info in expanded}
+    failed = []
+    for info in rename_info_list:
+        template_id = info.get('模板')
+        if template_id is None:
+            continue
+        template = template_map.get(template_id)
+        if template is None:
+            # 未知的模板编号无法对应到文件，所属文件会在下面作为没有结果的文件返回
+            continue
+        pending = [(name, value) for name, value in zip(template['names'], template['values'])
+                   if name not in answered]
+        try:
+            items = [
+                {'文件名': name, '重命名': info['重命名'].format(*[_Value(v) for v in value]), '置信度': info.get('置信度')}
+                for name, value in pending
+            ]
+        except (IndexError, KeyError, ValueError) as e:
+            failed.extend((name, info.get('重命名', ''), f"展开模板{template_id}失败: {str(e)}") for name, _ in pending)
+            answered.update(name for name, _ in pending)
+            continue
+        expanded.extend(items)
+        answered.update(name for name, _ in pending)
+
+    for template_id, template in template_map.items():
+        failed.extend((name, '', f"模型没有返回模板{template_id}的结果")
+                      for name in template['names'] if name not in answered)
+    return expanded, failed
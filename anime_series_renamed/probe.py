@@ -0,0 +1,362 @@
+import os
+import json
+import struct
+import shutil
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# 探测结果缓存文件名，保存在番剧目录下
+PROBE_CACHE_NAME = '.probe_cache.json'
+
+# MKV(EBML) 元素ID
+EBML_SEGMENT = 0x18538067
+EBML_SEEK_HEAD = 0x114D9B74
+EBML_SEEK = 0x4DBB
+EBML_SEEK_ID = 0x53AB
+EBML_SEEK_POSITION = 0x53AC
+EBML_INFO = 0x1549A966
+EBML_TIMECODE_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+EBML_TRACKS = 0x1654AE6B
+EBML_TRACK_ENTRY = 0xAE
+EBML_TRACK_TYPE = 0x83
+EBML_CODEC_ID = 0x86
+EBML_VIDEO = 0xE0
+EBML_PIXEL_WIDTH = 0xB0
+EBML_PIXEL_HEIGHT = 0xBA
+EBML_CLUSTER = 0x1F43B675
+
+# 单个头部元素的读取上限，防止损坏文件导致读取整个文件
+MAX_HEADER_SIZE = 64 * 1024 * 1024
+
+CODEC_NAMES = {
+    'V_MPEG4/ISO/AVC': 'AVC', 'avc1': 'AVC', 'avc3': 'AVC', 'h264': 'AVC',
+    'V_MPEGH/ISO/HEVC': 'HEVC', 'hvc1': 'HEVC', 'hev1': 'HEVC', 'hevc': 'HEVC',
+    'V_AV1': 'AV1', 'av01': 'AV1', 'av1': 'AV1',
+    'V_VP9': 'VP9', 'vp09': 'VP9', 'vp9': 'VP9',
+}
+
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool) -> tuple[int, int]:
+    """读取EBML变长整数，返回(值, 新位置)，元素ID保留标记位，大小去掉标记位"""
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError('无效的EBML变长整数')
+    value = first if keep_marker else first & (mask - 1)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        # 全1表示未知大小
+        value = -1
+    return value, pos + length
+
+
+def _read_element_header(f) -> tuple[int, int]:
+    """从文件当前位置读取元素ID和大小"""
+    head = f.read(12)
+    if len(head) < 2:
+        raise EOFError
+    element_id, pos = _read_vint(head, 0, True)
+    size, pos = _read_vint(head, pos, False)
+    f.seek(pos - len(head), os.SEEK_CUR)
+    return element_id, size
+
+
+def _iter_elements(data: bytes):
+    """遍历内存中的EBML子元素"""
+    pos = 0
+    while pos < len(data):
+        element_id, pos = _read_vint(data, pos, True)
+        size, pos = _read_vint(data, pos, False)
+        if size < 0:
+            size = len(data) - pos
+        yield element_id, data[pos:pos + size]
+        pos += size
+
+
+def _read_uint(data: bytes) -> int:
+    return int.from_bytes(data, 'big')
+
+
+def _read_float(data: bytes) -> float:
+    if len(data) == 4:
+        return struct.unpack('>f', data)[0]
+    return struct.unpack('>d', data)[0]
+
+
+def _read_body(f, size: int) -> bytes:
+    if size < 0 or size > MAX_HEADER_SIZE:
+        raise ValueError('头部元素过大')
+    return f.read(size)
+
+
+def _parse_mkv_info(body: bytes, info: dict):
+    scale = 1000000
+    duration = None
+    for element_id, data in _iter_elements(body):
+        if element_id == EBML_TIMECODE_SCALE:
+            scale = _read_uint(data)
+        elif element_id == EBML_DURATION:
+            duration = _read_float(data)
+    if duration is not None:
+        info['duration'] = duration * scale / 1e9
+
+
+def _parse_mkv_tracks(body: bytes, info: dict):
+    for element_id, entry in _iter_elements(body):
+        if element_id != EBML_TRACK_ENTRY:
+            continue
+        fields = dict(_iter_elements(entry))
+        if _read_uint(fields.get(EBML_TRACK_TYPE, b'')) != 1:
+            continue
+        codec_id = fields.get(EBML_CODEC_ID, b'').decode('ascii', 'ignore').rstrip('\x00')
+        info['codec'] = CODEC_NAMES.get(codec_id, codec_id)
+        video = dict(_iter_elements(fields.get(EBML_VIDEO, b'')))
+        if EBML_PIXEL_WIDTH in video and EBML_PIXEL_HEIGHT in video:
+            info['width'] = _read_uint(video[EBML_PIXEL_WIDTH])
+            info['height'] = _read_uint(video[EBML_PIXEL_HEIGHT])
+        return
+
+
+def probe_mkv(path: str) -> dict:
+    """
+    读取MKV头部的Info和Tracks元素
+    Cluster之前没有找到时，按SeekHead记录的位置跳转读取，不读取媒体数据
+    """
+    info = {}
+    with open(path, 'rb') as f:
+        element_id, size = _read_element_header(f)
+        if element_id != 0x1A45DFA3:
+            raise ValueError('不是MKV文件')
+        f.seek(size, os.SEEK_CUR)
+        element_id, _ = _read_element_header(f)
+        if element_id != EBML_SEGMENT:
+            raise ValueError('未找到Segment')
+        segment_start = f.tell()
+
+        found = set()
+        seek_positions = {}
+        while found != {EBML_INFO, EBML_TRACKS}:
+            try:
+                element_id, size = _read_element_header(f)
+            except (EOFError, IndexError):
+                break
+            if element_id == EBML_INFO:
+                _parse_mkv_info(_read_body(f, size), info)
+                found.add(element_id)
+            elif element_id == EBML_TRACKS:
+                _parse_mkv_tracks(_read_body(f, size), info)
+                found.add(element_id)
+            elif element_id == EBML_SEEK_HEAD:
+                for seek_element, seek in _iter_elements(_read_body(f, size)):
+                    if seek_element == EBML_SEEK:
+                        fields = dict(_iter_elements(seek))
+                        seek_positions[_read_uint(fields.get(EBML_SEEK_ID, b''))] = \
+                            _read_uint(fields.get(EBML_SEEK_POSITION, b''))
+            elif element_id == EBML_CLUSTER or size < 0:
+                break
+            else:
+                f.seek(size, os.SEEK_CUR)
+
+        for element_id in (EBML_INFO, EBML_TRACKS):
+            if element_id in found or element_id not in seek_positions:
+                continue
+            f.seek(segment_start + seek_positions[element_id])
+            found_id, size = _read_element_header(f)
+            if found_id == EBML_INFO:
+                _parse_mkv_info(_read_body(f, size), info)
+            elif found_id == EBML_TRACKS:
+                _parse_mkv_tracks(_read_body(f, size), info)
+    return info
+
+
+def _iter_boxes(data: bytes):
+    """遍历内存中的MP4 box"""
+    pos = 0
+    while pos + 8 <= len(data):
+        size, box_type = struct.unpack('>I4s', data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = len(data) - pos
+        if size < header:
+            return
+        yield box_type, data[pos + header:pos + size]
+        pos += size
+
+
+def _parse_moov(moov: bytes) -> dict:
+    info = {}
+    for box_type, body in _iter_boxes(moov):
+        if box_type == b'mvhd':
+            if body[0] == 1:
+                timescale, duration = struct.unpack('>IQ', body[20:32])
+            else:
+                timescale, duration = struct.unpack('>II', body[12:20])
+            if timescale:
+                info['duration'] = duration / timescale
+        elif box_type == b'trak' and 'codec' not in info:
+            boxes = dict(_iter_boxes(body))
+            mdia = dict(_iter_boxes(boxes.get(b'mdia', b'')))
+            if mdia.get(b'hdlr', b'')[8:12] != b'vide':
+                continue
+            tkhd = boxes.get(b'tkhd', b'')
+            if len(tkhd) >= 8:
+                width, height = struct.unpack('>II', tkhd[-8:])
+                info['width'], info['height'] = width >> 16, height >> 16
+            minf = dict(_iter_boxes(mdia.get(b'minf', b'')))
+            stbl = dict(_iter_boxes(minf.get(b'stbl', b'')))
+            stsd = stbl.get(b'stsd', b'')
+            if len(stsd) >= 16:
+                codec = stsd[12:16].decode('ascii', 'ignore')
+                info['codec'] = CODEC_NAMES.get(codec, codec)
+    return info
+
+
+def probe_mp4(path: str) -> dict:
+    """只读取MP4顶层box的头部，跳过mdat，读取moov"""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError('未找到moov')
+            size, box_type = struct.unpack('>I4s', header)
+            header_size = 8
+            if size == 1:
+                size = struct.unpack('>Q', f.read(8))[0]
+                header_size = 16
+            elif size == 0:
+                if box_type != b'moov':
+                    raise ValueError('未找到moov')
+                size = MAX_HEADER_SIZE + header_size
+            if size < header_size:
+                raise ValueError('无效的box大小')
+            if box_type == b'moov':
+                return _parse_moov(_read_body(f, min(size - header_size, MAX_HEADER_SIZE)))
+            f.seek(size - header_size, os.SEEK_CUR)
+
+
+def probe_ffprobe(path: str) -> dict:
+    """使用ffprobe读取第一个视频流信息"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0',
+         '-show_entries', 'stream=codec_name,width,height:format=duration',
+         '-of', 'json', path],
+        capture_output=True, text=True, timeout=30, check=True
+    )
+    data = json.loads(result.stdout)
+    info = {}
+    streams = data.get('streams') or [{}]
+    if streams[0].get('codec_name'):
+        info['codec'] = CODEC_NAMES.get(streams[0]['codec_name'], streams[0]['codec_name'].upper())
+    if streams[0].get('width') and streams[0].get('height'):
+        info['width'], info['height'] = streams[0]['width'], streams[0]['height']
+    if data.get('format', {}).get('duration'):
+        info['duration'] = float(data['format']['duration'])
+    return info
+
+
+def probe_file(path: str) -> dict:
+    """优先直接解析容器头部，失败或不支持时使用ffprobe"""
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext in ('.mkv', '.webm'):
+            return probe_mkv(path)
+        if ext in ('.mp4', '.mov', '.m4v'):
+            return probe_mp4(path)
+    except (OSError, ValueError, EOFError, IndexError, struct.error):
+        pass
+    if shutil.which('ffprobe'):
+        try:
+            return probe_ffprobe(path)
+        except Exception:
+            pass
+    return {}
+
+
+def format_media_info(info: dict) -> str:
+    """将探测结果格式化为提示词中使用的标签，如 1080P HEVC 23:40"""
+    tags = []
+    width, height = info.get('width'), info.get('height')
+    if width and height:
+        # 宽度或高度任一达到即可，兼容 1920x800 这类宽银幕和 1440x1080 这类非方形像素的分辨率
+        if width >= 3800 or height >= 2000:
+            tags.append('2160P')
+        elif width >= 1900 or height >= 1000:
+            tags.append('1080P')
+        elif width >= 1260 or height >= 700:
+            tags.append('720P')
+        else:
+            tags.append(f'{height}P')
+    if info.get('codec'):
+        tags.append(info['codec'])
+    if info.get('duration'):
+        minutes, seconds = divmod(int(info['duration']), 60)
+        tags.append(f'{minutes}:{seconds:02d}')
+    return ' '.join(tags)
+
+
+class ProbeCache:
+    """以路径、大小和修改时间为键的探测结果缓存"""
+
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.dirty = False
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def get(self, path: str, stat: os.stat_result):
+        entry = self.entries.get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            return entry['info']
+        return None
+
+    def put(self, path: str, stat: os.stat_result, info: dict):
+        with self.lock:
+            self.entries[path] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'info': info}
+            self.dirty = True
+
+    def save(self):
+        if not self.dirty:
+            return
+        # 只保留仍然存在的文件
+        self.entries = {path: entry for path, entry in self.entries.items() if os.path.exists(path)}
+        temp_path = self.cache_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(temp_path, self.cache_path)
+        self.dirty = False
+
+
+def probe_files(paths: list, cache: ProbeCache = None, max_workers: int = 8) -> dict:
+    """在有界线程池中探测多个文件，返回 路径 -> 探测结果"""
+    def probe(path: str):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return path, {}
+        info = cache.get(path, stat) if cache else None
+        if info is None:
+            info = probe_file(path)
+            if cache:
+                cache.put(path, stat, info)
+        return path, info
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = dict(executor.map(probe, paths))
+    if cache:
+        cache.save()
+    return results
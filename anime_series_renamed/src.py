@@ -1,17 +1,50 @@
 import os
+import re
+import json
+import time
+import uuid
+import logging
 import argparse
+import textwrap
+import threading
 from openai import OpenAI
 from pathlib import Path
 from typing import List
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from probe import PROBE_CACHE_NAME, ProbeCache, probe_files, format_media_info
+from compress import COMPRESS_RULE, build_compressed_prompt, expand_response
 
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# 重命名日志文件名，保存在番剧目录下，用于撤销
+JOURNAL_NAME = '.rename_journal.jsonl'
+
+VIDEO_EXTENSIONS = {'.mp4', '.mkv', '.avi', '.mov', '.rmvb', '.flv', '.wmv', '.webm'}
+SUBTITLE_EXTENSIONS = {'.srt', '.ass', '.ssa'}
+
+# 下载器未完成文件的后缀，存在同名的这类文件时说明还在下载
+DOWNLOADING_SUFFIXES = ('.part', '.!qb', '.aria2', '.crdownload', '.tmp')
+
+# 已经符合重命名格式的文件，监控模式下不再处理
+RENAMED_PATTERN = re.compile(r'^.+ - S\d{2}E\d{2,3}( - .+)?\.[^.]+$')
+
+# 监控模式下批次失败（如接口不可用）后的重试间隔，按失败次数翻倍，最长与原来的定时任务间隔相同
+RETRY_DELAY = 30.0
+MAX_RETRY_DELAY = 300.0
+
+# 目录修改时间与上次扫描时间相差不超过该秒数时，仍重新列出该目录
+# 网络共享、FAT等修改时间精度较低的文件系统上，同一时间刻度内新建的文件不会改变目录的修改时间
+MTIME_MARGIN = 2.0
+
 def get_all_files(directory: str) -> tuple[dict, dict]:
-    """获取目录下的所有文件，返回视频文件和字幕文件的字典"""
-    video_extensions = {'.mp4', '.mkv', '.avi', '.mov', '.rmvb', '.flv', '.wmv', '.webm'}
-    subtitle_extensions = {'.srt', '.ass', '.ssa'}
+    """获取目录下的所有文件，返回以相对路径为键、完整路径为值的视频文件和字幕文件字典"""
+    video_extensions = VIDEO_EXTENSIONS
+    subtitle_extensions = SUBTITLE_EXTENSIONS
     
     video_files = {}
     subtitle_files = {}
@@ -20,18 +53,22 @@ def get_all_files(directory: str) -> tuple[dict, dict]:
         for filename in filenames:
             ext = os.path.splitext(filename)[1].lower()
             full_path = os.path.join(root, filename)
+            # 使用相对路径作为键，避免不同季文件夹下的同名文件互相覆盖
+            rel_path = Path(os.path.relpath(full_path, directory)).as_posix()
             if ext in video_extensions:
-                video_files[filename] = full_path
+                video_files[rel_path] = full_path
             elif ext in subtitle_extensions:
-                subtitle_files[filename] = full_path
+                subtitle_files[rel_path] = full_path
                 
     return video_files, subtitle_files
 
-def generate_new_filename(video_name_list: List[str], subtitle_name_list: List[str]) -> str:
+def build_messages(video_name_list: List[str], subtitle_name_list: List[str],
+                   media_info: dict = None, compress: bool = False) -> tuple[list, dict]:
     """
-    使用大模型进行重命名设计
+    构建发送给大模型的消息，返回 (消息列表, 模板编号 -> 模板)
+    compress为True时相似文件名合并为模板，只发送变化的部分，不合并时模板为空
     """
-    system_prompt = """
+    rules = """
         你是一个番剧重命名助手，对番剧是视频文件和字幕文件进行重命名，返回json格式
 
         重命名规则：
@@ -40,7 +77,11 @@ def generate_new_filename(video_name_list: List[str], subtitle_name_list: List[s
         3. 季数和集数：采用S01E01的格式，从文件原始名称中提取，如果没有说明是第几季则默认是SO1。如果是是PV或者发现是不归属于正剧的视频则使用S00
         4. 额外信息：如果文件原始名称中包含的视频信息如1080p、BDRip则添加，其他信息则忽略
         5. 字幕文件必须和视频文件名称相同
-
+        6. 输入的是相对路径，"文件名"字段必须原样返回输入的相对路径，"重命名"字段只给出新文件名，不能包含目录
+        7. 如果提供了媒体信息，额外信息中的分辨率和编码以媒体信息为准，时长可用于判断是否为正剧
+        8. "置信度"字段给出0到1之间的数字，表示对重命名结果的把握程度
+"""
+    examples = """
         示例1：
         输入名称：[DBD-Raws][Re Zero kara Hajimeru Isekai Seikatsu Memory Snow][PV][01][1080P][BDRip][HEVC-10bit][FLAC].mkv
         输出名称：Re Zero kara Hajimeru Isekai Seikatsu Memory Snow - S00E01 - 1080P.BDRip.mkv
@@ -51,35 +92,283 @@ def generate_new_filename(video_name_list: List[str], subtitle_name_list: List[s
 
         输出json格式：
         [
-          {"文件名":"","重命名":""}
+          {"文件名":"","重命名":"","置信度":0.9}
         ]
         禁止使用```json```包裹代码
+"""
+    # 去掉缩进，避免每行的空格占用token
+    system_prompt = textwrap.dedent(rules + (COMPRESS_RULE if compress else '') + examples).strip()
+
+    if compress:
+        user_prompt, template_map = build_compressed_prompt(video_name_list, subtitle_name_list, media_info)
+    else:
+        template_map = {}
+        user_prompt = f"""
+    视频文件列表: {video_name_list}
+    字幕文件列表: {subtitle_name_list}
     """
+        if media_info:
+            user_prompt += f"    媒体信息: {media_info}\n"
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {
+            "role": "user",
+            "content": user_prompt,
+        },
+    ], template_map
 
+def request_completion(messages: list) -> str:
+    """调用大模型，返回回复内容"""
     client = OpenAI(
         api_key=os.getenv("OPENAI_API_KEY"),
         base_url=os.getenv("OPENAI_BASE_URL"),
     )
 
-    user_prompt = f"""
-    视频文件列表: {video_name_list}
-    字幕文件列表: {subtitle_name_list}
-    """
-    
     completion = client.chat.completions.create(
         model="gpt-4o",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": user_prompt,
-            },
-        ],
+        messages=messages,
     )
     
     return completion.choices[0].message.content.strip()
 
-def rename_files(directory: str):
+def build_rename_plan(rename_info_list: list, video_files: dict, subtitle_files: dict) -> list:
+    """根据AI返回结果创建以完整路径为键的重命名计划"""
+    rename_plan = []
+    for info in rename_info_list:
+        old_name = info['文件名']
+        new_name = info['重命名']
+
+        # 检查是视频还是字幕文件
+        if old_name in video_files:
+            file_type, old_path = '视频', video_files[old_name]
+        elif old_name in subtitle_files:
+            file_type, old_path = '字幕', subtitle_files[old_name]
+        else:
+            print(f"跳过未知文件: {old_name}")
+            continue
+
+        rename_plan.append({
+            'type': file_type,
+            'old_path': old_path,
+            'new_path': os.path.join(os.path.dirname(old_path), new_name),
+            'new_name': new_name,
+            'confidence': info.get('置信度')
+        })
+    return rename_plan
+
+def check_rename_plan(rename_plan: list) -> tuple[list, list]:
+    """检查重命名计划中的冲突，返回(可执行计划, 冲突列表)"""
+    key = lambda path: os.path.normcase(os.path.abspath(path))
+
+    sources = {}
+    targets = defaultdict(list)
+    for item in rename_plan:
+        sources.setdefault(key(item['old_path']), item)
+        targets[key(item['new_path'])].append(item)
+
+    valid_plan = []
+    conflicts = []
+    for item in rename_plan:
+        new_name = item['new_name']
+        if not new_name or os.path.basename(new_name) != new_name or new_name in ('.', '..'):
+            conflicts.append((item, '新文件名无效'))
+        elif sources[key(item['old_path'])] is not item:
+            conflicts.append((item, '同一文件存在多个重命名'))
+        elif key(item['old_path']) == key(item['new_path']) and item['old_path'] == item['new_path']:
+            # 名称未变化，无需处理
+            continue
+        elif len(targets[key(item['new_path'])]) > 1:
+            conflicts.append((item, '多个文件重命名为同一名称'))
+        elif (os.path.exists(item['new_path'])
+              and key(item['new_path']) not in sources
+              and not os.path.samefile(item['old_path'], item['new_path'])):
+            conflicts.append((item, '目标文件已存在'))
+        else:
+            valid_plan.append(item)
+
+    # 目标文件的原重命名被跳过时，该目标仍会存在，需要连带跳过
+    changed = True
+    while changed:
+        valid_sources = {key(item['old_path']) for item in valid_plan}
+        blocked = [item for item in valid_plan
+                   if key(item['new_path']) in sources
+                   and key(item['new_path']) not in valid_sources
+                   and os.path.exists(item['new_path'])
+                   and not os.path.samefile(item['old_path'], item['new_path'])]
+        changed = bool(blocked)
+        for item in blocked:
+            valid_plan.remove(item)
+            conflicts.append((item, '目标文件已存在'))
+    return valid_plan, conflicts
+
+def _plan_steps(rename_plan: list) -> dict:
+    """
+    将重命名计划拆分为按目录分组的步骤
+    目标名称被计划中其他文件占用时（如互换、链式重命名），先移动到临时名称再移动到目标
+    """
+    key = lambda path: os.path.normcase(os.path.abspath(path))
+    sources = {key(item['old_path']) for item in rename_plan}
+
+    steps_by_dir = defaultdict(lambda: ([], [], []))
+    for item in rename_plan:
+        to_temp, direct, from_temp = steps_by_dir[os.path.dirname(item['old_path'])]
+        old_path, new_path = item['old_path'], item['new_path']
+        if key(new_path) in sources and key(new_path) != key(old_path):
+            temp_path = os.path.join(os.path.dirname(old_path), f".renaming-{uuid.uuid4().hex}.tmp")
+            to_temp.append((old_path, temp_path))
+            from_temp.append((temp_path, new_path))
+        else:
+            direct.append((old_path, new_path))
+
+    return {d: to_temp + direct + from_temp for d, (to_temp, direct, from_temp) in steps_by_dir.items()}
+
+def _write_journal(journal, lock: threading.Lock, record: dict):
+    with lock:
+        journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        journal.flush()
+
+def _rollback(done_steps: list):
+    """按相反顺序撤回已完成的步骤"""
+    failed = 0
+    for src, dst in reversed(done_steps):
+        try:
+            os.rename(dst, src)
+        except Exception as e:
+            failed += 1
+            print(f"回滚失败 {dst} -> {src}: {str(e)}")
+    return failed
+
+def execute_rename_plan(rename_plan: list, journal_path: str, max_workers: int = 8,
+                        verbose: bool = True) -> bool:
+    """
+    按目录并行执行重命名，每一步都写入日志以便撤销
+    任意一步失败则回滚全部已完成的步骤
+    """
+    steps_by_dir = _plan_steps(rename_plan)
+    plan_id = uuid.uuid4().hex
+    lock = threading.Lock()
+    done_steps = []
+    failed = threading.Event()
+
+    def run_directory(steps: list):
+        for src, dst in steps:
+            if failed.is_set():
+                return
+            # 先记录意图再重命名，中断后撤销时可据此找回停留在临时名称的文件
+            _write_journal(journal, lock, {'op': 'begin', 'id': plan_id, 'src': src, 'dst': dst})
+            try:
+                os.rename(src, dst)
+            except Exception as e:
+                failed.set()
+                print(f"重命名失败 {src}: {str(e)}")
+                return
+            with lock:
+                done_steps.append((src, dst))
+            _write_journal(journal, lock, {'op': 'rename', 'id': plan_id, 'src': src, 'dst': dst})
+
+    # 追加写入，每次重命名是一段以plan开头的记录，撤销时从最后一段开始
+    with open(journal_path, 'a', encoding='utf-8') as journal:
+        _write_journal(journal, lock, {
+            'op': 'plan',
+            'id': plan_id,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'renames': [[item['old_path'], item['new_path']] for item in rename_plan]
+        })
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(run_directory, steps) for steps in steps_by_dir.values()]
+            for future in as_completed(futures):
+                future.result()
+
+        if failed.is_set():
+            print(f"检测到失败，开始回滚 {len(done_steps)} 个步骤")
+            rollback_failed = _rollback(done_steps)
+            _write_journal(journal, lock, {'op': 'rollback', 'id': plan_id, 'failed': rollback_failed})
+            return False
+
+        _write_journal(journal, lock, {'op': 'commit', 'id': plan_id})
+
+    if verbose:
+        for item in rename_plan:
+            print(f"重命名成功: {item['old_path']} -> {item['new_path']}")
+    return True
+
+def undo_renames(directory: str) -> bool:
+    """根据目录下的重命名日志撤销最近一次未撤销的重命名"""
+    journal_path = os.path.join(directory, JOURNAL_NAME)
+    if not os.path.isfile(journal_path):
+        print(f"未找到重命名日志: {journal_path}")
+        return False
+
+    segments = {}
+    closed = set()
+    with open(journal_path, 'r', encoding='utf-8') as journal:
+        for line in journal:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 日志最后一行可能因中断而不完整
+                continue
+            op, plan_id = record.get('op'), record.get('id')
+            if op == 'plan':
+                segments[plan_id] = {}
+            elif op in ('begin', 'rename') and plan_id in segments:
+                step = (record['src'], record['dst'])
+                # begin 表示即将执行，rename 表示已完成
+                segments[plan_id][step] = segments[plan_id].get(step, False) or op == 'rename'
+            elif op in ('rollback', 'undo'):
+                closed.add(plan_id)
+
+    pending = [plan_id for plan_id in segments if plan_id not in closed]
+    if not pending:
+        print("没有可以撤销的重命名")
+        return False
+
+    plan_id = pending[-1]
+    # 每个目录的步骤依次执行，只有最后一个begin可能是中断时正在执行的，按文件是否已移动判断
+    last_steps = {os.path.dirname(src): (src, dst) for src, dst in segments[plan_id]}
+    done_steps = [(src, dst) for (src, dst), done in segments[plan_id].items()
+                  if done or (last_steps[os.path.dirname(src)] == (src, dst)
+                              and os.path.exists(dst) and not os.path.exists(src))]
+    print(f"开始撤销 {len(done_steps)} 个步骤")
+    failed = _rollback(done_steps)
+    if failed:
+        print(f"撤销完成，{failed} 个步骤失败，日志已保留")
+        return False
+
+    with open(journal_path, 'a', encoding='utf-8') as journal:
+        _write_journal(journal, threading.Lock(), {'op': 'undo', 'id': plan_id})
+    print("撤销完成")
+    return True
+
+def probe_media(directory: str, video_files: dict, max_workers: int = 8) -> dict:
+    """读取视频文件头部获取分辨率、编码和时长，返回 相对路径 -> 媒体信息"""
+    cache = ProbeCache(os.path.join(directory, PROBE_CACHE_NAME))
+    results = probe_files(list(video_files.values()), cache, max_workers)
+    media_info = {}
+    for rel_path, full_path in video_files.items():
+        tags = format_media_info(results.get(full_path, {}))
+        if tags:
+            media_info[rel_path] = tags
+    return media_info
+
+def plan_renames(video_files: dict, subtitle_files: dict, media_info: dict = None,
+                 compress: bool = True) -> tuple[list, list]:
+    """调用AI生成重命名结果并检查冲突，返回(可执行计划, 冲突列表)"""
+    messages, template_map = build_messages(
+        list(video_files.keys()), list(subtitle_files.keys()), media_info, compress
+    )
+    rename_info_list, failed = expand_response(json.loads(request_completion(messages)), template_map)
+    rename_plan, conflicts = check_rename_plan(build_rename_plan(rename_info_list, video_files, subtitle_files))
+    # 模板展开失败或模型没有返回结果的文件与冲突的文件一起报告为跳过
+    for name, new_name, reason in failed:
+        file_type, old_path = ('视频', video_files[name]) if name in video_files else ('字幕', subtitle_files[name])
+        conflicts.append(({'type': file_type, 'old_path': old_path, 'new_path': None,
+                           'new_name': new_name, 'confidence': None}, reason))
+    return rename_plan, conflicts
+
+def rename_files(directory: str, max_workers: int = 8, probe: bool = False, compress: bool = True):
     """主函数：重命名文件"""
     video_files, subtitle_files = get_all_files(directory)
     if not video_files and not subtitle_files:
@@ -87,64 +376,345 @@ def rename_files(directory: str):
         return
     
     print(f"找到 {len(video_files)} 个视频文件和 {len(subtitle_files)} 个字幕文件")
-    
-    video_filenames = list(video_files.keys())
-    subtitle_filenames = list(subtitle_files.keys())
 
-    new_names_json = generate_new_filename(video_filenames, subtitle_filenames)
+    media_info = None
+    if probe:
+        media_info = probe_media(directory, video_files, max_workers)
+        print(f"已读取 {len(media_info)} 个视频文件的媒体信息")
+
     try:
-        import json
-        rename_plan = []
-        rename_info_list = json.loads(new_names_json)
-        
-        # 创建重命名计划
-        for info in rename_info_list:
-            old_name = info['文件名']
-            new_name = info['重命名']
-            
-            # 检查是视频还是字幕文件
-            if old_name in video_files:
-                rename_plan.append({
-                    'type': '视频',
-                    'old_path': video_files[old_name],
-                    'new_name': new_name
-                })
-            elif old_name in subtitle_files:
-                rename_plan.append({
-                    'type': '字幕',
-                    'old_path': subtitle_files[old_name],
-                    'new_name': new_name
-                })
-                
-        # 展示重命名计划
-        print("\n重命名计划:")
-        for item in rename_plan:
-            print(f"\n{item['type']}文件:")
-            print(f"{item['old_path']}")
-            print(f"-> {os.path.join(os.path.dirname(item['old_path']), item['new_name'])}")
-        
-        # 一次性确认
-        confirm = input("\n是否确认执行重命名？(y/n): ").lower()
-        if confirm == 'y':
-            for item in rename_plan:
-                try:
-                    new_file_path = os.path.join(
-                        os.path.dirname(item['old_path']),
-                        item['new_name']
-                    )
-                    os.rename(item['old_path'], new_file_path)
-                    print(f"重命名成功: {item['old_path']} -> {new_file_path}")
-                except Exception as e:
-                    print(f"重命名失败 {item['old_path']}: {str(e)}")
-        else:
-            print("已取消重命名操作")
+        rename_plan, conflicts = plan_renames(video_files, subtitle_files, media_info, compress)
     except Exception as e:
         print(f"解析AI返回结果失败: {str(e)}")
         return
 
+    # 展示重命名计划
+    print("\n重命名计划:")
+    for item in rename_plan:
+        print(f"\n{item['type']}文件:")
+        print(f"{item['old_path']}")
+        print(f"-> {item['new_path']}")
+
+    if conflicts:
+        print("\n以下文件存在冲突，将被跳过:")
+        for item, reason in conflicts:
+            print(f"{item['old_path']} -> {item['new_name']} ({reason})")
+
+    if not rename_plan:
+        print("\n没有需要重命名的文件")
+        return
+
+    # 一次性确认
+    confirm = input("\n是否确认执行重命名？(y/n): ").lower()
+    if confirm == 'y':
+        journal_path = os.path.join(directory, JOURNAL_NAME)
+        if execute_rename_plan(rename_plan, journal_path, max_workers):
+            print(f"\n重命名日志已保存到 {journal_path}，可使用 --undo 撤销")
+    else:
+        print("已取消重命名操作")
+
+class DirectoryWatcher:
+    """
+    监控下载目录中新到达的视频和字幕文件
+    有watchdog时基于inotify等系统事件，否则只重新扫描修改时间发生变化的目录
+    """
+
+    def __init__(self, directory: str, interval: float = 5.0):
+        self.directory = directory
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.arrived = set()
+        self.removed = set()
+        # 目录 -> {文件路径: (大小, 修改时间)}
+        self.files = {}
+        # 目录 -> (修改时间, 扫描时间)
+        self.dir_mtimes = {}
+        self.subdirs = {}
+        self.observer = None
+
+    def start(self):
+        # 记录已有文件，只处理启动之后到达的文件
+        self._poll(initial=True)
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            logger.info(f"未安装watchdog，使用轮询模式，间隔 {self.interval} 秒")
+            return
+
+        watcher = self
+
+        class Handler(FileSystemEventHandler):
+            def on_created(self, event):
+                if not event.is_directory:
+                    watcher._add(event.src_path)
+
+            def on_modified(self, event):
+                if not event.is_directory:
+                    watcher._add(event.src_path)
+
+            def on_moved(self, event):
+                if not event.is_directory:
+                    watcher._remove(event.src_path)
+                    watcher._add(event.dest_path)
+
+            def on_deleted(self, event):
+                if not event.is_directory:
+                    watcher._remove(event.src_path)
+
+        self.observer = Observer()
+        self.observer.schedule(Handler(), self.directory, recursive=True)
+        self.observer.start()
+        logger.info("使用文件系统事件监控")
+
+    def stop(self):
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+
+    def _add(self, path: str):
+        ext = os.path.splitext(path)[1].lower()
+        if ext in VIDEO_EXTENSIONS or ext in SUBTITLE_EXTENSIONS:
+            with self.lock:
+                self.arrived.add(path)
+
+    def _remove(self, path: str):
+        with self.lock:
+            self.arrived.discard(path)
+            self.removed.add(path)
+
+    def _poll(self, initial: bool = False):
+        """
+        只列出修改时间变化的目录，未变化的目录使用缓存的子目录列表，每次只需stat各个目录
+        列出目录时新出现或大小、修改时间变化的文件作为到达，不再存在的文件作为删除
+        """
+        stack = [self.directory]
+        while stack:
+            current = stack.pop()
+            try:
+                mtime = os.stat(current).st_mtime_ns
+                cached = self.dir_mtimes.get(current)
+                if cached and cached[0] == mtime and cached[1] - mtime / 1e9 > MTIME_MARGIN:
+                    stack.extend(self.subdirs[current])
+                    continue
+                scanned_at = time.time()
+                old_files = self.files.get(current, {})
+                subdirs = []
+                files = {}
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                            continue
+                        stat = entry.stat()
+                        files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                        if not initial and old_files.get(entry.path) != files[entry.path]:
+                            self._add(entry.path)
+                for path in old_files.keys() - files.keys():
+                    self._remove(path)
+                # 删除的子目录不再扫描，同时清理它的缓存
+                for removed in set(self.subdirs.get(current, ())) - set(subdirs):
+                    self._forget(removed)
+                self.dir_mtimes[current] = (mtime, scanned_at)
+                self.files[current] = files
+                self.subdirs[current] = subdirs
+                stack.extend(subdirs)
+            except OSError as e:
+                logger.error(f"扫描目录失败 {current}: {str(e)}")
+
+    def _forget(self, directory: str):
+        self.dir_mtimes.pop(directory, None)
+        for path in self.files.pop(directory, {}):
+            self._remove(path)
+        for subdir in self.subdirs.pop(directory, ()):
+            self._forget(subdir)
+
+    def take(self) -> tuple[set, set]:
+        """返回自上次调用以来 (到达的文件, 删除或移走的文件)"""
+        if self.observer is None:
+            self._poll()
+        with self.lock:
+            arrived, self.arrived = self.arrived, set()
+            removed, self.removed = self.removed, set()
+        return arrived, removed
+
+def _file_signature(path: str):
+    """文件的 (大小, 修改时间)，文件不存在时返回None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def _is_downloading(path: str) -> bool:
+    """下载器的临时文件仍存在时认为文件还在下载"""
+    return any(os.path.exists(path + suffix) for suffix in DOWNLOADING_SUFFIXES)
+
+def _check_confidence(item: dict, min_confidence: float) -> str:
+    """按置信度策略检查重命名项，返回不自动执行的原因，可以自动执行时返回空字符串"""
+    try:
+        confidence = float(item['confidence'])
+    except (TypeError, ValueError):
+        return '缺少置信度'
+    if confidence < min_confidence:
+        return f'置信度过低 ({confidence:.2f})'
+    if os.path.splitext(item['new_name'])[1].lower() != os.path.splitext(item['old_path'])[1].lower():
+        return '后缀发生变化'
+    if not RENAMED_PATTERN.match(item['new_name']):
+        return '不符合命名格式'
+    return ''
+
+def watch_directory(directory: str, interval: float = 5.0, settle: float = 30.0,
+                    min_confidence: float = 0.8, max_workers: int = 8, probe: bool = False,
+                    compress: bool = True):
+    """
+    监控模式：新文件大小稳定后按批次自动重命名，无需人工确认
+    interval: 检查间隔秒数
+    settle: 文件大小保持不变的秒数，同时也是批次的等待时间
+    min_confidence: 自动执行所需的最低置信度，低于该值的只记录日志
+    probe: 是否读取视频文件头部获取媒体信息
+    compress: 是否将相似文件名合并为模板发送
+    """
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    journal_path = os.path.join(directory, JOURNAL_NAME)
+    watcher = DirectoryWatcher(directory, interval)
+    watcher.start()
+    logger.info(f"开始监控目录: {directory}")
+
+    # 待处理文件 -> (大小, 修改时间, 最后变化时间)
+    pending = {}
+    # 已处理过、保持原名的文件（如需要人工确认的文件） -> (大小, 修改时间)
+    # 文件被删除、移走或内容变化后会重新处理
+    handled = {}
+    # 批次失败的文件 -> (失败次数, 下次重试时间)
+    retries = {}
+    last_arrival = 0.0
+
+    try:
+        while True:
+            time.sleep(interval)
+            now = time.monotonic()
+
+            arrived, removed = watcher.take()
+            for path in removed:
+                handled.pop(path, None)
+                retries.pop(path, None)
+                pending.pop(path, None)
+
+            for path in arrived:
+                if RENAMED_PATTERN.match(os.path.basename(path)):
+                    continue
+                signature = _file_signature(path)
+                if signature is not None and handled.get(path) == signature:
+                    continue
+                handled.pop(path, None)
+                if path not in pending:
+                    pending[path] = (-1, -1, now)
+                last_arrival = now
+
+            ready = []
+            for path, (size, mtime, changed_at) in list(pending.items()):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    # 文件被删除或已被移走
+                    del pending[path]
+                    retries.pop(path, None)
+                    continue
+                if (stat.st_size, stat.st_mtime_ns) != (size, mtime):
+                    pending[path] = (stat.st_size, stat.st_mtime_ns, now)
+                elif (now - changed_at >= settle and now >= retries.get(path, (0, 0.0))[1]
+                      and not _is_downloading(path)):
+                    ready.append(path)
+
+            # 仍有文件在写入或刚有新文件到达时继续等待，凑成一批再处理
+            if not ready or len(ready) < len(pending) and now - last_arrival < settle:
+                continue
+
+            failed = set(_process_batch(directory, ready, journal_path, min_confidence, max_workers, probe, compress))
+            for path in ready:
+                if path in failed:
+                    # 保留在待处理列表中，等待重试
+                    count = retries.get(path, (0, 0.0))[0] + 1
+                    delay = min(RETRY_DELAY * 2 ** (count - 1), MAX_RETRY_DELAY)
+                    retries[path] = (count, now + delay)
+                    continue
+                del pending[path]
+                retries.pop(path, None)
+                # 重命名成功的文件原路径已不存在，只记录保持原名的文件
+                signature = _file_signature(path)
+                if signature is not None:
+                    handled[path] = signature
+            if failed:
+                delay = max(retries[path][1] for path in failed) - now
+                logger.warning(f"{len(failed)} 个文件处理失败，将在 {delay:.0f} 秒后重试")
+    except KeyboardInterrupt:
+        logger.info("停止监控")
+    finally:
+        watcher.stop()
+
+def _process_batch(directory: str, paths: list, journal_path: str,
+                   min_confidence: float, max_workers: int, probe: bool = False,
+                   compress: bool = True) -> list:
+    """处理一批已稳定的文件，返回需要重试的文件路径，全部处理完成时返回空列表"""
+    video_files = {}
+    subtitle_files = {}
+    for path in paths:
+        rel_path = Path(os.path.relpath(path, directory)).as_posix()
+        if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+            video_files[rel_path] = path
+        else:
+            subtitle_files[rel_path] = path
+
+    logger.info(f"处理批次: {len(video_files)} 个视频文件和 {len(subtitle_files)} 个字幕文件")
+    try:
+        media_info = probe_media(directory, video_files, max_workers) if probe else None
+        rename_plan, conflicts = plan_renames(video_files, subtitle_files, media_info, compress)
+    except Exception as e:
+        logger.error(f"生成重命名计划失败: {str(e)}")
+        return paths
+
+    for item, reason in conflicts:
+        logger.warning(f"跳过 {item['old_path']} -> {item['new_name']}: {reason}")
+
+    auto_plan = []
+    for item in rename_plan:
+        reason = _check_confidence(item, min_confidence)
+        if reason:
+            logger.warning(f"需人工确认 {item['old_path']} -> {item['new_name']}: {reason}")
+        else:
+            auto_plan.append(item)
+
+    # 置信度不足的文件保持原名，需要重新检查是否占用了其他文件的目标名称
+    auto_plan, blocked = check_rename_plan(auto_plan)
+    for item, reason in blocked:
+        logger.warning(f"跳过 {item['old_path']} -> {item['new_name']}: {reason}")
+
+    if not auto_plan:
+        return []
+
+    if execute_rename_plan(auto_plan, journal_path, max_workers, verbose=False):
+        for item in auto_plan:
+            logger.info(f"自动重命名: {item['old_path']} -> {item['new_path']}")
+        return []
+    logger.error("本批次重命名失败，已回滚")
+    return [item['old_path'] for item in auto_plan]
+
 def main():
     parser = argparse.ArgumentParser(description='番剧重命名工具')
     parser.add_argument('directory', help='番剧目录路径')
+    parser.add_argument('--undo', action='store_true', help='根据重命名日志撤销上一次重命名')
+    parser.add_argument('--workers', type=int, default=8, help='并行重命名的目录数，网络共享目录可适当调大')
+    parser.add_argument('--probe', action='store_true', help='读取视频文件头部获取实际分辨率、编码和时长')
+    parser.add_argument('--no-compress', action='store_true', help='不合并相似文件名，逐个发送完整文件名')
+    parser.add_argument('--watch', action='store_true', help='监控模式，新文件下载完成后自动重命名')
+    parser.add_argument('--interval', type=float, default=5.0, help='监控模式的检查间隔秒数')
+    parser.add_argument('--settle', type=float, default=30.0, help='监控模式下文件大小保持不变多少秒后视为下载完成')
+    parser.add_argument('--min-confidence', type=float, default=0.8, help='监控模式下自动重命名所需的最低置信度')
 
     args = parser.parse_args()
     
@@ -152,7 +722,16 @@ def main():
         print(f"错误: {args.directory} 不是一个有效的目录")
         return
     
-    rename_files(args.directory)
+    if args.undo:
+        undo_renames(args.directory)
+        return
+
+    if args.watch:
+        watch_directory(args.directory, args.interval, args.settle, args.min_confidence, args.workers, args.probe,
+                        not args.no_compress)
+        return
+
+    rename_files(args.directory, args.workers, args.probe, not args.no_compress)
 
 if __name__ == "__main__":
     main() 
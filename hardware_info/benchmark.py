@@ -0,0 +1,209 @@
+import io
+import os
+import mmap
+import time
+import random
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+# 多进程测试前预留的启动时间，所有进程在同一时刻开始计时
+START_DELAY = 1.5 if os.name == 'nt' else 0.5
+
+def _process_counts(max_count):
+    """测试的进程数：1、2、4……以及CPU线程数"""
+    counts = set()
+    count = 1
+    while count < max_count:
+        counts.add(count)
+        count *= 2
+    counts.add(max_count)
+    return sorted(counts)
+
+def _run_until(start_at, seconds, work):
+    """等到start_at后重复执行work，返回(次数, 实际耗时)"""
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    begin = time.perf_counter()
+    end = begin + seconds - max(0.0, time.time() - start_at)
+    ops = 0
+    while time.perf_counter() < end:
+        work()
+        ops += 1
+    return ops, time.perf_counter() - begin
+
+def _cpu_work():
+    x = 0
+    for i in range(10000):
+        x = (x * 31 + i) & 0xFFFFFFFF
+    return x
+
+def _cpu_worker(start_at, seconds):
+    return _run_until(start_at, seconds, _cpu_work)
+
+_jpeg_data = None
+
+def _make_jpeg():
+    """生成一张1920x1080的测试JPEG"""
+    from PIL import Image
+    image = Image.effect_noise((480, 270), 64).convert('RGB').resize((1920, 1080))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+def _jpeg_work():
+    from PIL import Image
+    with Image.open(io.BytesIO(_jpeg_data)) as image:
+        image.load()
+
+def _jpeg_worker(start_at, seconds, data):
+    global _jpeg_data
+    _jpeg_data = data
+    return _run_until(start_at, seconds, _jpeg_work)
+
+def _scaling(worker, max_workers, seconds, *args):
+    """对每个进程数同时运行worker，返回 [(进程数, 每秒次数)]"""
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for count in _process_counts(max_workers):
+            start_at = time.time() + START_DELAY
+            futures = [executor.submit(worker, start_at, seconds, *args) for _ in range(count)]
+            throughput = sum(ops / elapsed for ops, elapsed in (f.result() for f in futures) if elapsed > 0)
+            results.append((count, throughput))
+    return results
+
+def _scaling_table(results, unit):
+    single = results[0][1] or 1
+    return [
+        {'进程数': count, '吞吐量': f"{throughput:.1f} {unit}", '加速比': f"{throughput / single:.2f}",
+         '效率': f"{throughput / single / count * 100:.0f}%"}
+        for count, throughput in results
+    ]
+
+def recommend_workers(results):
+    """吞吐量达到最大值90%的最少进程数"""
+    best = max(throughput for _, throughput in results)
+    return next(count for count, throughput in results if throughput >= best * 0.9)
+
+def benchmark_memory(seconds, size=64 * 1024**2):
+    """内存复制速度，有NumPy时使用np.copyto，否则使用memoryview整块复制"""
+    try:
+        import numpy as np
+        src = np.ones(size // 8)
+        dst = np.empty_like(src)
+        copy = lambda: np.copyto(dst, src)
+    except ImportError:
+        src = bytearray(os.urandom(1024)) * (size // 1024)
+        dst = bytearray(size)
+        view = memoryview(dst)
+        def copy():
+            view[:] = src
+
+    copy()
+    ops, elapsed = _run_until(time.time(), seconds, copy)
+    return size * ops / elapsed
+
+def _open_direct(path):
+    """尽量使用O_DIRECT绕过页缓存，不支持时(如tmpfs、Windows)使用普通模式"""
+    flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+    if hasattr(os, 'O_DIRECT'):
+        try:
+            return io.FileIO(os.open(path, flags | os.O_DIRECT), 'r+b'), True
+        except OSError:
+            pass
+    return io.FileIO(os.open(path, flags), 'r+b'), False
+
+def _drop_cache(f):
+    f.flush()
+    os.fsync(f.fileno())
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+def benchmark_disk(path, seconds, file_size=256 * 1024**2, block_size=4 * 1024**2, io_size=4096):
+    """在path目录下用临时文件测试顺序读写和4K随机读写"""
+    fd, temp_path = tempfile.mkstemp(prefix='hardware_info_bench_', dir=path)
+    os.close(fd)
+    result = {}
+    try:
+        f, direct = _open_direct(temp_path)
+        with f:
+            # mmap分配的内存按页对齐，满足O_DIRECT的要求
+            block = mmap.mmap(-1, block_size)
+            block.write(os.urandom(block_size))
+            small = mmap.mmap(-1, io_size)
+
+            written = 0
+            begin = time.perf_counter()
+            while written < file_size and time.perf_counter() - begin < seconds * 3:
+                written += f.write(block)
+            _drop_cache(f)
+            elapsed = time.perf_counter() - begin
+            result['顺序写入'] = written / elapsed
+
+            f.seek(0)
+            read = 0
+            begin = time.perf_counter()
+            while read < written and time.perf_counter() - begin < seconds * 3:
+                n = f.readinto(block)
+                if not n:
+                    break
+                read += n
+            result['顺序读取'] = read / (time.perf_counter() - begin)
+
+            blocks = max(1, written // io_size)
+            def random_read():
+                f.seek(random.randrange(blocks) * io_size)
+                f.readinto(small)
+            ops, elapsed = _run_until(time.time(), seconds, random_read)
+            result['随机读取'] = ops / elapsed
+
+            def random_write():
+                f.seek(random.randrange(blocks) * io_size)
+                f.write(small)
+            ops, elapsed = _run_until(time.time(), seconds, random_write)
+            begin = time.perf_counter()
+            _drop_cache(f)
+            result['随机写入'] = ops / (elapsed + time.perf_counter() - begin)
+            result['直接IO'] = direct
+    finally:
+        os.remove(temp_path)
+    return result
+
+def run_benchmarks(disk_path=None, seconds=1.0, max_workers=None):
+    """
+    运行所有性能测试，返回与其他硬件信息相同格式的字典
+    disk_path: 磁盘测试的目录，默认系统临时目录
+    seconds: 每项测量的时长
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    info = {}
+
+    cpu_results = _scaling(_cpu_worker, max_workers, seconds)
+    info['单核CPU'] = f"{cpu_results[0][1]:.1f} 次/秒"
+    info['CPU多进程扩展'] = _scaling_table(cpu_results, '次/秒')
+    recommend_from = cpu_results
+
+    info['内存复制速度'] = f"{benchmark_memory(seconds) / 1024**3:.2f} GB/s"
+
+    try:
+        disk = benchmark_disk(disk_path or tempfile.gettempdir(), seconds)
+        info['磁盘顺序写入'] = f"{disk['顺序写入'] / 1024**2:.1f} MB/s"
+        info['磁盘顺序读取'] = f"{disk['顺序读取'] / 1024**2:.1f} MB/s"
+        info['磁盘4K随机读取'] = f"{disk['随机读取']:.0f} IOPS"
+        info['磁盘4K随机写入'] = f"{disk['随机写入']:.0f} IOPS"
+        info['磁盘直接IO'] = '是' if disk['直接IO'] else '否(结果可能受缓存影响)'
+    except OSError as e:
+        info['磁盘测试错误'] = str(e)
+
+    try:
+        jpeg = _make_jpeg()
+        jpeg_results = _scaling(_jpeg_worker, max_workers, seconds, jpeg)
+        info['JPEG解码(单核)'] = f"{jpeg_results[0][1]:.1f} 张/秒"
+        info['JPEG解码多进程扩展'] = _scaling_table(jpeg_results, '张/秒')
+        # 图片处理任务以JPEG解码的扩展情况为准
+        recommend_from = jpeg_results
+    except ImportError:
+        info['JPEG解码(单核)'] = '未安装Pillow，跳过'
+
+    info['推荐并行数'] = recommend_workers(recommend_from)
+    return info
@@ -0,0 +1,247 @@
+import os
+import re
+import glob
+import platform
+
+# 直接读取procfs/sysfs，不启动子进程，root参数用于指向伪造的目录树进行测试
+
+PCI_VENDORS = {
+    '0x10de': 'NVIDIA Corporation',
+    '0x1002': 'Advanced Micro Devices, Inc. [AMD/ATI]',
+    '0x8086': 'Intel Corporation',
+    '0x1a03': 'ASPEED Technology, Inc.',
+    '0x15ad': 'VMware',
+    '0x1af4': 'Red Hat, Inc.',
+    '0x1234': 'QEMU',
+}
+
+PCI_IDS_PATHS = ['usr/share/hwdata/pci.ids', 'usr/share/misc/pci.ids']
+
+# 不是物理磁盘的块设备
+VIRTUAL_BLOCK_PREFIXES = ('loop', 'ram', 'zram', 'dm-', 'md', 'sr', 'nbd')
+
+def _path(root, *parts):
+    return os.path.join(root, *[part.lstrip('/') for part in parts])
+
+def _read(root, *parts, default=None):
+    """读取文件内容，文件不存在或没有权限时返回默认值"""
+    try:
+        with open(_path(root, *parts), 'r', encoding='utf-8', errors='replace') as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+def get_processor():
+    """获取处理器标识，platform.processor()在Linux下会启动uname子进程，这里直接使用架构名"""
+    return platform.machine()
+
+def get_boot_id(root='/'):
+    """当前启动的标识，重启后变化，用于判断静态信息缓存是否有效"""
+    return _read(root, 'proc/sys/kernel/random/boot_id', default='')
+
+def same_boot(cached, current):
+    """boot_id每次启动随机生成，相同即为同一次启动"""
+    return cached == current
+
+def get_cpu_frequency(root='/'):
+    """获取CPU当前频率，优先使用cpufreq，没有时使用/proc/cpuinfo中的值"""
+    cur_freq = _read(root, 'sys/devices/system/cpu/cpu0/cpufreq/scaling_cur_freq')
+    if cur_freq and cur_freq.isdigit():
+        return f"{int(cur_freq) / 1000:.2f} MHz"
+    match = re.search(r'^cpu MHz\s*:\s*([\d.]+)', _read(root, 'proc/cpuinfo', default=''), re.M)
+    return f"{float(match.group(1)):.2f} MHz" if match else "未知"
+
+def get_cpu_info(root='/'):
+    """获取CPU详细信息"""
+    info = {}
+    try:
+        model = vendor = None
+        threads = 0
+        cores = set()
+        physical_id = core_id = None
+        cpuinfo = _read(root, 'proc/cpuinfo', default='')
+        for line in cpuinfo.splitlines() + ['']:
+            if not line.strip():
+                # 每个逻辑处理器以空行结束
+                if physical_id is not None or core_id is not None:
+                    cores.add((physical_id, core_id))
+                physical_id = core_id = None
+                continue
+            key, _, value = line.partition(':')
+            key, value = key.strip(), value.strip()
+            if key == 'processor':
+                threads += 1
+            elif key in ('model name', 'Model') and model is None:
+                model = value
+            elif key == 'vendor_id' and vendor is None:
+                vendor = value
+            elif key == 'physical id':
+                physical_id = value
+            elif key == 'core id':
+                core_id = value
+
+        info['CPU型号'] = model or '未知'
+        info['CPU核心数'] = len(cores) or threads
+        info['CPU线程数'] = threads
+        info['CPU频率'] = get_cpu_frequency(root)
+        info['CPU厂商'] = vendor or '未知'
+    except Exception as e:
+        info['错误'] = f"获取CPU信息时出错: {str(e)}"
+    return info
+
+def _smbios_strings(raw, length):
+    """SMBIOS结构的字符串表，序号从1开始"""
+    return [s.decode('ascii', 'replace').strip() for s in raw[length:].split(b'\0\0')[0].split(b'\0')]
+
+def _read_memory_devices(root):
+    """读取SMBIOS类型17(内存设备)，通常需要root权限，无法读取时返回空列表"""
+    modules = []
+    for entry in sorted(glob.glob(_path(root, 'sys/firmware/dmi/entries/17-*/raw'))):
+        try:
+            with open(entry, 'rb') as f:
+                raw = f.read()
+        except OSError:
+            continue
+        if len(raw) < 0x1B:
+            continue
+        length = raw[1]
+        strings = _smbios_strings(raw, length)
+        string = lambda offset: strings[raw[offset] - 1] if 0 < raw[offset] <= len(strings) and strings[raw[offset] - 1] else '未知'
+
+        size = int.from_bytes(raw[0x0C:0x0E], 'little')
+        if size in (0, 0xFFFF):
+            # 空插槽或未知
+            continue
+        if size == 0x7FFF and length >= 0x20:
+            size_bytes = int.from_bytes(raw[0x1C:0x20], 'little') * 1024**2
+        elif size & 0x8000:
+            size_bytes = (size & 0x7FFF) * 1024
+        else:
+            size_bytes = size * 1024**2
+        speed = int.from_bytes(raw[0x15:0x17], 'little')
+
+        modules.append({
+            '容量': f"{size_bytes / (1024**3):.2f} GB",
+            '厂商': string(0x17),
+            '型号': string(0x1A),
+            '速度': f"{speed} MHz" if speed else '未知',
+            '序列号': string(0x18),
+            '_bytes': size_bytes,
+        })
+    return modules
+
+def get_detailed_memory_info(root='/'):
+    """获取详细的内存信息"""
+    info = {}
+    try:
+        modules = _read_memory_devices(root)
+        if modules:
+            total = sum(module.pop('_bytes') for module in modules)
+        else:
+            # 没有权限读取SMBIOS时使用内核统计的总内存
+            match = re.search(r'^MemTotal:\s+(\d+) kB', _read(root, 'proc/meminfo', default=''), re.M)
+            total = int(match.group(1)) * 1024 if match else 0
+
+        info['内存条数量'] = len(modules)
+        info['总物理内存'] = f"{total / (1024**3):.2f} GB"
+        info['内存条详情'] = modules
+    except Exception as e:
+        info['错误'] = f"获取内存信息时出错: {str(e)}"
+    return info
+
+def _interface_type(root, name):
+    if name.startswith('nvme'):
+        return 'NVMe'
+    if name.startswith('mmcblk'):
+        return 'MMC'
+    if name.startswith('vd'):
+        return 'VirtIO'
+    device_path = os.path.realpath(_path(root, 'sys/block', name))
+    if '/usb' in device_path:
+        return 'USB'
+    return 'SCSI'
+
+def get_detailed_disk_info(root='/'):
+    """获取详细的磁盘信息"""
+    info = {}
+    try:
+        for name in sorted(os.listdir(_path(root, 'sys/block'))):
+            if name.startswith(VIRTUAL_BLOCK_PREFIXES):
+                continue
+            sectors = _read(root, 'sys/block', name, 'size', default='0')
+            disk_info = {}
+            disk_info['型号'] = _read(root, 'sys/block', name, 'device/model') or '未知'
+            disk_info['接口类型'] = _interface_type(root, name)
+            disk_info['序列号'] = (_read(root, 'sys/block', name, 'device/serial')
+                                 or _read(root, 'sys/block', name, 'serial') or '未知')
+            # size 的单位固定为512字节
+            disk_info['总容量'] = f"{int(sectors) * 512 / (1024**3):.2f} GB" if sectors.isdigit() and int(sectors) else '未知'
+            info[f'物理磁盘 /dev/{name}'] = disk_info
+    except Exception as e:
+        info['错误'] = f"获取磁盘信息时出错: {str(e)}"
+    return info
+
+def get_motherboard_info(root='/'):
+    """获取主板详细信息"""
+    info = {}
+    try:
+        # board_serial 通常只有root可读
+        info['主板厂商'] = _read(root, 'sys/class/dmi/id/board_vendor') or '未知'
+        info['主板型号'] = _read(root, 'sys/class/dmi/id/board_name') or '未知'
+        info['主板序列号'] = _read(root, 'sys/class/dmi/id/board_serial') or '未知'
+        info['主板版本'] = _read(root, 'sys/class/dmi/id/board_version') or '未知'
+    except Exception as e:
+        info['错误'] = f"获取主板信息时出错: {str(e)}"
+    return info
+
+def _pci_device_name(root, vendor_id, device_id):
+    """从pci.ids中查找设备名称，只扫描到对应厂商的段落"""
+    vendor_hex, device_hex = vendor_id[2:].lower(), device_id[2:].lower()
+    for pci_ids in PCI_IDS_PATHS:
+        try:
+            with open(_path(root, pci_ids), 'r', encoding='utf-8', errors='replace') as f:
+                in_vendor = False
+                for line in f:
+                    if in_vendor:
+                        if not line.startswith('\t'):
+                            break
+                        if line.startswith('\t' + device_hex + ' '):
+                            return line.strip()[len(device_hex):].strip()
+                    elif line.startswith(vendor_hex + ' '):
+                        in_vendor = True
+        except OSError:
+            continue
+    return None
+
+def get_gpu_info(root='/'):
+    """获取显卡详细信息"""
+    info = {}
+    try:
+        gpus = []
+        drm = _path(root, 'sys/class/drm')
+        cards = sorted(name for name in os.listdir(drm) if re.fullmatch(r'card\d+', name)) if os.path.isdir(drm) else []
+        for card in cards:
+            device = os.path.join('sys/class/drm', card, 'device')
+            vendor_id = _read(root, device, 'vendor', default='')
+            device_id = _read(root, device, 'device', default='')
+
+            gpu_info = {}
+            gpu_info['显卡名称'] = (_pci_device_name(root, vendor_id, device_id) if vendor_id and device_id else None) \
+                or f"{vendor_id}:{device_id}"
+            # 只有amdgpu提供显存大小
+            vram = _read(root, device, 'mem_info_vram_total')
+            if vram and vram.isdigit() and int(vram) > 0:
+                gpu_info['显存大小'] = f"{int(vram) / (1024**3):.2f} GB"
+            else:
+                gpu_info['显存大小'] = "共享显存" if vendor_id == '0x8086' else '未知'
+            driver_link = _path(root, device, 'driver')
+            driver = os.path.basename(os.readlink(driver_link)) if os.path.islink(driver_link) else None
+            gpu_info['驱动版本'] = (_read(root, 'sys/module', driver, 'version') or driver) if driver else '未知'
+            gpu_info['显卡厂商'] = PCI_VENDORS.get(vendor_id, vendor_id or '未知')
+            gpus.append(gpu_info)
+
+        info['显卡数量'] = len(gpus)
+        info['显卡详情'] = gpus
+    except Exception as e:
+        info['错误'] = f"获取显卡信息时出错: {str(e)}"
+    return info
@@ -0,0 +1,159 @@
+import os
+import sys
+import math
+import time
+from array import array
+
+import psutil
+from tabulate import tabulate
+
+class RingBuffer:
+    """基于array的定长环形缓冲区，写入时不分配新对象"""
+
+    def __init__(self, capacity):
+        self.data = array('d', bytes(8 * capacity))
+        self.capacity = capacity
+        self.index = 0
+        self.count = 0
+
+    def push(self, value):
+        self.data[self.index] = value
+        self.index = (self.index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def latest(self):
+        return self.data[self.index - 1] if self.count else 0.0
+
+    def stats(self):
+        """返回 (最小值, 平均值, p95)"""
+        if not self.count:
+            return 0.0, 0.0, 0.0
+        ordered = sorted(self.data[:self.count])
+        # 最近秩法，样本较少时不会偏低
+        return ordered[0], sum(ordered) / self.count, ordered[math.ceil(0.95 * self.count) - 1]
+
+class HardwareMonitor:
+    """
+    按固定间隔通过psutil采样CPU每个核心的占用和频率、内存、磁盘IO和网络流量
+    每个指标一个环形缓冲区，采样值写入预先分配的数组
+    """
+
+    def __init__(self, interval=1.0, capacity=300):
+        self.interval = interval
+        self.cpu_count = len(psutil.cpu_percent(percpu=True))
+        freqs = psutil.cpu_freq(percpu=True) or []
+        self.freq_count = len(freqs)
+
+        self.names = [f'CPU{i}占用(%)' for i in range(self.cpu_count)]
+        self.names += [f'CPU{i}频率(MHz)' for i in range(self.freq_count)]
+        self.names += ['内存占用(%)', '内存已用(GB)', '磁盘读取(MB/s)', '磁盘写入(MB/s)', '网络上传(MB/s)', '网络下载(MB/s)']
+        self.buffers = [RingBuffer(capacity) for _ in self.names]
+        self.timestamps = RingBuffer(capacity)
+        self.sample = array('d', bytes(8 * len(self.names)))
+
+        self.last_time = time.monotonic()
+        self.last_disk = psutil.disk_io_counters()
+        self.last_net = psutil.net_io_counters()
+
+    def collect(self):
+        """采集一次，写入self.sample和各个环形缓冲区"""
+        now = time.monotonic()
+        elapsed = max(now - self.last_time, 1e-6)
+        sample = self.sample
+        i = 0
+        for value in psutil.cpu_percent(percpu=True)[:self.cpu_count]:
+            sample[i] = value
+            i += 1
+        freqs = psutil.cpu_freq(percpu=True) or []
+        for j in range(self.freq_count):
+            sample[i] = freqs[j].current if j < len(freqs) else 0.0
+            i += 1
+
+        memory = psutil.virtual_memory()
+        sample[i] = memory.percent
+        sample[i + 1] = memory.used / 1024**3
+        i += 2
+
+        disk = psutil.disk_io_counters()
+        if disk and self.last_disk:
+            sample[i] = (disk.read_bytes - self.last_disk.read_bytes) / elapsed / 1024**2
+            sample[i + 1] = (disk.write_bytes - self.last_disk.write_bytes) / elapsed / 1024**2
+        i += 2
+
+        net = psutil.net_io_counters()
+        if net and self.last_net:
+            sample[i] = (net.bytes_sent - self.last_net.bytes_sent) / elapsed / 1024**2
+            sample[i + 1] = (net.bytes_recv - self.last_net.bytes_recv) / elapsed / 1024**2
+
+        self.last_time, self.last_disk, self.last_net = now, disk, net
+        for buffer, value in zip(self.buffers, sample):
+            buffer.push(value)
+        self.timestamps.push(time.time())
+
+    def table(self):
+        """当前值和滚动窗口内的最小值、平均值、p95"""
+        rows = []
+        for name, buffer in zip(self.names, self.buffers):
+            low, avg, p95 = buffer.stats()
+            rows.append([name, f"{buffer.latest():.2f}", f"{low:.2f}", f"{avg:.2f}", f"{p95:.2f}"])
+        return tabulate(rows, headers=['指标', '当前', '最小', '平均', 'p95'], tablefmt='simple')
+
+class SampleWriter:
+    """将每次采样追加写入CSV或JSONL文件，按扩展名选择格式"""
+
+    def __init__(self, path, names):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.jsonl = path.lower().endswith('.jsonl')
+        if self.jsonl:
+            # 预先生成格式模板，写入时不需要为每次采样创建字典
+            fields = ', '.join(f'"{name}": {{:.3f}}' for name in names)
+            self.template = '{{"time": {:.3f}, ' + fields + '}}\n'
+        else:
+            self.file.write(','.join(['time'] + names) + '\n')
+            self.template = '{:.3f}' + ',{:.3f}' * len(names) + '\n'
+
+    def write(self, timestamp, sample):
+        self.file.write(self.template.format(timestamp, *sample))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+def run_monitor(interval=1.0, capacity=300, export=None, duration=None, live=True):
+    """
+    持续监控，直到按Ctrl+C或达到duration秒
+    interval: 采样间隔秒数
+    capacity: 每个指标保留的采样数，滚动统计基于这些采样
+    export: 导出文件路径，.csv或.jsonl
+    live: 是否刷新显示实时表格
+    """
+    monitor = HardwareMonitor(interval, capacity)
+    if live and os.name == 'nt':
+        # 启用Windows控制台的ANSI转义序列
+        os.system('')
+    writer = SampleWriter(export, monitor.names) if export else None
+    start = time.monotonic()
+    next_time = start + interval
+    try:
+        while duration is None or time.monotonic() - start < duration:
+            time.sleep(max(0.0, next_time - time.monotonic()))
+            # 按固定节拍采样，处理耗时不会累积成漂移
+            next_time += interval
+            monitor.collect()
+            if writer:
+                writer.write(monitor.timestamps.latest(), monitor.sample)
+            if live:
+                sys.stdout.write('\033[H\033[J')
+                sys.stdout.write(f"采样间隔: {interval}秒  窗口: {monitor.timestamps.count}/{capacity}  (Ctrl+C 退出)\n\n")
+                sys.stdout.write(monitor.table() + '\n')
+                sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if writer:
+            writer.close()
+
+    print("\n=== 监控统计 ===")
+    print(monitor.table())
+    return monitor
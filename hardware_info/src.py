@@ -1,149 +1,219 @@
-import psutil
-import cpuinfo
 import platform
-import wmi
 from datetime import datetime
-from tabulate import tabulate
 import os
+import io
 import sys
+import csv
+import json
+import time
+import argparse
+import multiprocessing
+import threading
 
+# 按系统选择采集后端，Linux直接读取procfs/sysfs，其他系统使用WMI
+if platform.system() == 'Linux':
+    import linux_backend as backend
+else:
+    import windows_backend as backend
+
+# 采集器注册表：名称 -> (采集函数, 超时秒数, 是否静态信息)
+COLLECTORS = {}
+
+# 静态信息缓存的默认有效期
+DEFAULT_CACHE_TTL = 24 * 3600
+
+def collector(name, timeout=10.0, static=True):
+    """
+    注册采集器，所有采集器由collect_hardware_info在各自的线程中并行执行
+    static为True的采集结果在重启前不会变化，可以缓存
+    """
+    def decorator(func):
+        COLLECTORS[name] = (func, timeout, static)
+        return func
+    return decorator
+
+def _init_worker():
+    """采集线程初始化：Windows下以多线程套间初始化COM，使同一个WMI连接可以在采集线程间共享"""
+    try:
+        import pythoncom
+        pythoncom.CoInitializeEx(pythoncom.COINIT_MULTITHREADED)
+    except ImportError:
+        pass
+
+@collector('系统信息')
 def get_system_info():
     """获取系统基本信息"""
     info = {}
     info['系统'] = platform.system()
     info['系统版本'] = platform.version()
     info['系统架构'] = platform.machine()
-    info['处理器'] = platform.processor()
+    info['处理器'] = backend.get_processor()
     info['主机名'] = platform.node()
     return info
 
+@collector('CPU信息')
 def get_cpu_info():
     """获取CPU详细信息"""
-    info = {}
-    try:
-        cpu_info = cpuinfo.get_cpu_info()
-        info['CPU型号'] = cpu_info.get('brand_raw', '未知')
-        info['CPU核心数'] = psutil.cpu_count(logical=False)
-        info['CPU线程数'] = psutil.cpu_count(logical=True)
-        cpu_freq = psutil.cpu_freq()
-        info['CPU频率'] = f"{cpu_freq.current:.2f} MHz" if cpu_freq else "未知"
-        info['CPU厂商'] = cpu_info.get('vendor_id_raw', '未知')
-    except Exception as e:
-        info['错误'] = f"获取CPU信息时出错: {str(e)}"
-    return info
+    return backend.get_cpu_info()
+
+@collector('CPU频率', static=False)
+def get_cpu_frequency():
+    """获取CPU当前频率，每次都重新读取"""
+    return {'CPU频率': backend.get_cpu_frequency()}
 
+@collector('内存信息')
 def get_detailed_memory_info():
     """获取详细的内存信息"""
-    info = {}
-    try:
-        c = wmi.WMI()
-        
-        # 获取物理内存信息
-        total_physical_memory = 0
-        memory_modules = []
-        
-        for mem in c.Win32_PhysicalMemory():
-            module = {}
-            module['容量'] = f"{int(mem.Capacity) / (1024**3):.2f} GB"
-            module['厂商'] = mem.Manufacturer if mem.Manufacturer else '未知'
-            module['型号'] = mem.PartNumber if mem.PartNumber else '未知'
-            module['速度'] = f"{mem.Speed} MHz" if mem.Speed else '未知'
-            module['序列号'] = mem.SerialNumber if mem.SerialNumber else '未知'
-            memory_modules.append(module)
-            total_physical_memory += int(mem.Capacity)
-        
-        info['内存条数量'] = len(memory_modules)
-        info['总物理内存'] = f"{total_physical_memory / (1024**3):.2f} GB"
-        info['内存条详情'] = memory_modules
-    except Exception as e:
-        info['错误'] = f"获取内存信息时出错: {str(e)}"
-    
-    return info
+    return backend.get_detailed_memory_info()
 
+@collector('磁盘信息')
 def get_detailed_disk_info():
     """获取详细的磁盘信息"""
-    info = {}
-    try:
-        c = wmi.WMI()
-        
-        # 获取物理磁盘信息
-        for disk in c.Win32_DiskDrive():
-            disk_info = {}
-            disk_info['型号'] = disk.Model
-            disk_info['接口类型'] = disk.InterfaceType
-            disk_info['序列号'] = disk.SerialNumber
-            disk_info['总容量'] = f"{int(disk.Size) / (1024**3):.2f} GB" if disk.Size else '未知'
-            info[f'物理磁盘 {disk.DeviceID}'] = disk_info
-    except Exception as e:
-        info['错误'] = f"获取磁盘信息时出错: {str(e)}"
-
-    return info
+    return backend.get_detailed_disk_info()
 
+@collector('主板信息')
 def get_motherboard_info():
     """获取主板详细信息"""
-    info = {}
-    try:
-        c = wmi.WMI()
-        
-        for board in c.Win32_BaseBoard():
-            info['主板厂商'] = board.Manufacturer
-            info['主板型号'] = board.Product
-            info['主板序列号'] = board.SerialNumber
-            info['主板版本'] = board.Version
-    except Exception as e:
-        info['错误'] = f"获取主板信息时出错: {str(e)}"
-    
-    return info
+    return backend.get_motherboard_info()
 
+@collector('显卡信息')
 def get_gpu_info():
     """获取显卡详细信息"""
-    info = {}
-    try:
-        c = wmi.WMI()
-        
-        gpus = []
-        # 虚拟设备的特征关键词
-        virtual_keywords = ['Oray', 'LuminonCore', 'Twomon', 'Virtual', 'Remote', 'DisplayLink']
-        
-        for gpu in c.Win32_VideoController():
-            # 跳过虚拟设备
-            if any(keyword in gpu.Name for keyword in virtual_keywords):
-                continue
-                
-            gpu_info = {}
-            gpu_info['显卡名称'] = gpu.Name
-            # 处理显存大小，如果为0或无效则显示为"共享显存"
-            if gpu.AdapterRAM and int(gpu.AdapterRAM) > 0:
-                gpu_info['显存大小'] = f"{int(gpu.AdapterRAM) / (1024**3):.2f} GB"
-            else:
-                gpu_info['显存大小'] = "共享显存"
-            gpu_info['驱动版本'] = gpu.DriverVersion
-            gpu_info['显卡厂商'] = gpu.AdapterCompatibility
-            gpus.append(gpu_info)
-        
-        info['显卡数量'] = len(gpus)
-        info['显卡详情'] = gpus
-    except Exception as e:
-        info['错误'] = f"获取显卡信息时出错: {str(e)}"
-    return info
+    return backend.get_gpu_info()
+
+def collect_hardware_info(names=None):
+    """
+    每个采集器在单独的守护线程中并行执行，返回 名称 -> 采集结果 的快照
+    总耗时约等于最慢的采集器，超时的采集器结果为错误信息
+    卡住的查询（如WMI无响应）所在的守护线程不会阻止进程退出
+    """
+    names = names or list(COLLECTORS)
+    results = {}
+    done = {name: threading.Event() for name in names}
 
-def print_hardware_info():
+    def run(name):
+        _init_worker()
+        try:
+            results[name] = COLLECTORS[name][0]()
+        except Exception as e:
+            results[name] = {'错误': f"获取{name}时出错: {str(e)}"}
+        finally:
+            done[name].set()
+
+    start = time.monotonic()
+    for name in names:
+        threading.Thread(target=run, args=(name,), name=f'collector-{name}', daemon=True).start()
+
+    snapshot = {}
+    for name in names:
+        timeout = COLLECTORS[name][1]
+        if done[name].wait(max(0, start + timeout - time.monotonic())):
+            snapshot[name] = results[name]
+        else:
+            snapshot[name] = {'错误': f"获取{name}超时({timeout}秒)"}
+    return snapshot
+
+def default_cache_path():
+    """静态信息缓存文件的默认位置"""
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'hardware_info', 'inventory.json')
+
+def get_hardware_snapshot(cache_path=None, ttl=DEFAULT_CACHE_TTL, refresh=False):
+    """
+    获取硬件信息快照，静态信息优先读取缓存，动态信息（如CPU频率）每次都重新获取
+    缓存以主机名和启动标识为键，重启、超过ttl秒或refresh为True时重新查询
+    cache_path为None时不使用缓存
+    """
+    static_names = [name for name, (_, _, static) in COLLECTORS.items() if static]
+    dynamic_names = [name for name in COLLECTORS if name not in static_names]
+    node, boot_id = platform.node(), backend.get_boot_id()
+
+    static_info = None
+    if cache_path and not refresh:
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('node') == node and backend.same_boot(cache.get('boot_id'), boot_id) \
+                    and time.time() - cache.get('time', 0) < ttl \
+                    and set(static_names) <= set(cache.get('snapshot', {})):
+                static_info = cache['snapshot']
+        except (OSError, ValueError):
+            pass
+
+    if static_info is None:
+        snapshot = collect_hardware_info(static_names + dynamic_names)
+        static_info = {name: snapshot[name] for name in static_names}
+        # 有错误的结果不缓存，下次重新查询
+        if cache_path and not any('错误' in info for info in static_info.values()):
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                temp_path = cache_path + '.tmp'
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'node': node, 'boot_id': boot_id, 'time': time.time(), 'snapshot': static_info}, f, ensure_ascii=False)
+                os.replace(temp_path, cache_path)
+            except OSError as e:
+                print(f"保存缓存失败: {str(e)}", file=sys.stderr)
+    else:
+        snapshot = collect_hardware_info(dynamic_names) if dynamic_names else {}
+
+    result = {name: static_info[name] for name in static_names}
+    # 动态信息合并到对应的静态信息中，保持原有字段顺序
+    # 本次读取失败或超时时不使用缓存中以前的频率
+    frequency = snapshot.get('CPU频率', {})
+    if '错误' not in result['CPU信息']:
+        result['CPU信息']['CPU频率'] = frequency.get('CPU频率', '未知')
+    return result
+
+def _flatten(value, prefix=''):
+    """将嵌套的字典和列表展开为 (字段路径, 值) 列表"""
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = ((str(i), v) for i, v in enumerate(value, 1))
+    else:
+        return [(prefix, value)]
+    rows = []
+    for key, child in items:
+        rows.extend(_flatten(child, f"{prefix}.{key}" if prefix else key))
+    return rows
+
+def format_snapshot(snapshot, output_format):
+    """将快照格式化为json或csv文本"""
+    if output_format == 'json':
+        return json.dumps(snapshot, ensure_ascii=False, indent=2)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(['类别', '字段', '值'])
+    for section, info in snapshot.items():
+        for field, value in _flatten(info):
+            writer.writerow([section, field, value])
+    return buffer.getvalue()
+
+def print_hardware_info(snapshot=None):
     """打印所有硬件信息"""
+    # 只有表格输出需要tabulate，--json/--csv不导入以减少启动时间
+    from tabulate import tabulate
     try:
+        if snapshot is None:
+            snapshot = collect_hardware_info()
+
         print("\n=== 系统信息 ===")
-        for key, value in get_system_info().items():
+        for key, value in snapshot['系统信息'].items():
             print(f"{key}: {value}")
         
         print("\n=== CPU信息 ===")
-        for key, value in get_cpu_info().items():
+        for key, value in snapshot['CPU信息'].items():
             print(f"{key}: {value}")
         
         print("\n=== 主板信息 ===")
-        for key, value in get_motherboard_info().items():
+        for key, value in snapshot['主板信息'].items():
             print(f"{key}: {value}")
         
         print("\n=== 内存信息 ===")
-        memory_info = get_detailed_memory_info()
+        memory_info = snapshot['内存信息']
         if '错误' in memory_info:
             print(f"错误: {memory_info['错误']}")
         else:
@@ -165,7 +235,7 @@ def print_hardware_info():
             print(tabulate(memory_table, headers=headers, tablefmt='grid', maxcolwidths=[5, 10, 15, 20, 10, 15]))
         
         print("\n=== 显卡信息 ===")
-        gpu_info = get_gpu_info()
+        gpu_info = snapshot['显卡信息']
         if '错误' in gpu_info:
             print(f"错误: {gpu_info['错误']}")
         else:
@@ -183,7 +253,7 @@ def print_hardware_info():
             print(tabulate(gpu_table, headers=headers, tablefmt='grid', maxcolwidths=[5, 30, 10, 15, 15]))
         
         print("\n=== 磁盘信息 ===")
-        disk_info = get_detailed_disk_info()
+        disk_info = snapshot['磁盘信息']
         if '错误' in disk_info:
             print(f"错误: {disk_info['错误']}")
         else:
@@ -199,6 +269,16 @@ def print_hardware_info():
                     info['总容量']
                 ])
             print(tabulate(disk_table, headers=headers, tablefmt='grid', maxcolwidths=[5, 30, 10, 15, 10]))
+
+        if '性能测试' in snapshot:
+            print("\n=== 性能测试 ===")
+            for key, value in snapshot['性能测试'].items():
+                if isinstance(value, list):
+                    # 多进程扩展结果以表格形式显示
+                    print(f"\n{key}:")
+                    print(tabulate([list(row.values()) for row in value], headers=list(value[0].keys()), tablefmt='grid'))
+                else:
+                    print(f"{key}: {value}")
     except Exception as e:
         print(f"打印硬件信息时发生错误: {str(e)}")
 
@@ -207,12 +287,54 @@ def is_frozen():
     return getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS')
 
 def main():
+    parser = argparse.ArgumentParser(description='硬件信息查看工具')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出')
+    parser.add_argument('--csv', action='store_true', help='以CSV格式输出')
+    parser.add_argument('--refresh', action='store_true', help='忽略缓存，重新查询静态信息')
+    parser.add_argument('--no-cache', action='store_true', help='不使用静态信息缓存')
+    parser.add_argument('--cache-file', default=default_cache_path(), help='静态信息缓存文件路径')
+    parser.add_argument('--ttl', type=float, default=DEFAULT_CACHE_TTL, help='静态信息缓存有效期秒数')
+    parser.add_argument('--monitor', action='store_true', help='持续监控CPU、内存、磁盘IO和网络')
+    parser.add_argument('--interval', type=float, default=1.0, help='监控采样间隔秒数')
+    parser.add_argument('--window', type=int, default=300, help='滚动统计保留的采样数')
+    parser.add_argument('--duration', type=float, help='监控时长秒数，默认一直运行直到Ctrl+C')
+    parser.add_argument('--export', help='将监控采样导出到.csv或.jsonl文件')
+    parser.add_argument('--no-live', action='store_true', help='监控时不刷新实时表格，只在结束时输出统计')
+    parser.add_argument('--benchmark', action='store_true', help='运行CPU、内存、磁盘和JPEG解码性能测试')
+    parser.add_argument('--bench-path', help='磁盘测试的目录，默认系统临时目录')
+    parser.add_argument('--bench-seconds', type=float, default=1.0, help='每项性能测量的时长秒数')
+    args = parser.parse_args()
+    if args.window < 1:
+        parser.error('--window 必须大于等于1')
+    if args.interval <= 0:
+        parser.error('--interval 必须大于0')
+
     # 设置工作目录，确保在打包后资源文件路径正确
     if is_frozen():
         os.chdir(os.path.dirname(sys.executable))
+
+    if args.monitor:
+        from monitor import run_monitor
+        run_monitor(args.interval, args.window, args.export, args.duration, not args.no_live)
+        return
+
+    cache_path = None if args.no_cache else args.cache_file
+    if args.json or args.csv:
+        # 机器可读输出用于批量采集，不等待回车
+        snapshot = get_hardware_snapshot(cache_path, args.ttl, args.refresh)
+        if args.benchmark:
+            from benchmark import run_benchmarks
+            snapshot['性能测试'] = run_benchmarks(args.bench_path, args.bench_seconds)
+        print(format_snapshot(snapshot, 'json' if args.json else 'csv'))
+        return
     
     try:
-        print_hardware_info()
+        snapshot = get_hardware_snapshot(cache_path, args.ttl, args.refresh)
+        if args.benchmark:
+            from benchmark import run_benchmarks
+            print("正在运行性能测试，大约需要半分钟...")
+            snapshot['性能测试'] = run_benchmarks(args.bench_path, args.bench_seconds)
+        print_hardware_info(snapshot)
     except Exception as e:
         print(f"发生错误: {str(e)}")
     
@@ -220,4 +342,6 @@ def main():
     input("\n按回车键退出...")
 
 if __name__ == "__main__":
+    # 打包后的程序在Windows下启动性能测试子进程时需要
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
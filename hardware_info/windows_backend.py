@@ -0,0 +1,150 @@
+import platform
+import threading
+import psutil
+import cpuinfo
+
+# WMI连接在所有采集器间共享，只在第一次使用时创建
+_session_lock = threading.Lock()
+_wmi_session = None
+
+def get_wmi():
+    """获取共享的WMI连接，只在第一次调用时创建"""
+    global _wmi_session
+    with _session_lock:
+        if _wmi_session is None:
+            # wmi只能在Windows下安装，延迟导入
+            import wmi
+            _wmi_session = wmi.WMI()
+        return _wmi_session
+
+def get_processor():
+    """获取处理器标识"""
+    return platform.processor()
+
+# psutil.boot_time()在Windows下不同进程之间可能相差1秒左右
+BOOT_TIME_TOLERANCE = 5.0
+
+def get_boot_id():
+    """当前启动的标识，重启后变化，用于判断静态信息缓存是否有效"""
+    return str(psutil.boot_time())
+
+def same_boot(cached, current):
+    """启动时间相差在容差内视为同一次启动"""
+    try:
+        return abs(float(cached) - float(current)) <= BOOT_TIME_TOLERANCE
+    except (TypeError, ValueError):
+        return False
+
+def get_cpu_frequency():
+    """获取CPU当前频率"""
+    cpu_freq = psutil.cpu_freq()
+    return f"{cpu_freq.current:.2f} MHz" if cpu_freq else "未知"
+
+def get_cpu_info():
+    """获取CPU详细信息"""
+    info = {}
+    try:
+        cpu_info = cpuinfo.get_cpu_info()
+        info['CPU型号'] = cpu_info.get('brand_raw', '未知')
+        info['CPU核心数'] = psutil.cpu_count(logical=False)
+        info['CPU线程数'] = psutil.cpu_count(logical=True)
+        info['CPU频率'] = get_cpu_frequency()
+        info['CPU厂商'] = cpu_info.get('vendor_id_raw', '未知')
+    except Exception as e:
+        info['错误'] = f"获取CPU信息时出错: {str(e)}"
+    return info
+
+def get_detailed_memory_info():
+    """获取详细的内存信息"""
+    info = {}
+    try:
+        c = get_wmi()
+        
+        # 获取物理内存信息
+        total_physical_memory = 0
+        memory_modules = []
+        
+        for mem in c.Win32_PhysicalMemory():
+            module = {}
+            module['容量'] = f"{int(mem.Capacity) / (1024**3):.2f} GB"
+            module['厂商'] = mem.Manufacturer if mem.Manufacturer else '未知'
+            module['型号'] = mem.PartNumber if mem.PartNumber else '未知'
+            module['速度'] = f"{mem.Speed} MHz" if mem.Speed else '未知'
+            module['序列号'] = mem.SerialNumber if mem.SerialNumber else '未知'
+            memory_modules.append(module)
+            total_physical_memory += int(mem.Capacity)
+        
+        info['内存条数量'] = len(memory_modules)
+        info['总物理内存'] = f"{total_physical_memory / (1024**3):.2f} GB"
+        info['内存条详情'] = memory_modules
+    except Exception as e:
+        info['错误'] = f"获取内存信息时出错: {str(e)}"
+    
+    return info
+
+def get_detailed_disk_info():
+    """获取详细的磁盘信息"""
+    info = {}
+    try:
+        c = get_wmi()
+        
+        # 获取物理磁盘信息
+        for disk in c.Win32_DiskDrive():
+            disk_info = {}
+            disk_info['型号'] = disk.Model
+            disk_info['接口类型'] = disk.InterfaceType
+            disk_info['序列号'] = disk.SerialNumber
+            disk_info['总容量'] = f"{int(disk.Size) / (1024**3):.2f} GB" if disk.Size else '未知'
+            info[f'物理磁盘 {disk.DeviceID}'] = disk_info
+    except Exception as e:
+        info['错误'] = f"获取磁盘信息时出错: {str(e)}"
+
+    return info
+
+def get_motherboard_info():
+    """获取主板详细信息"""
+    info = {}
+    try:
+        c = get_wmi()
+        
+        for board in c.Win32_BaseBoard():
+            info['主板厂商'] = board.Manufacturer
+            info['主板型号'] = board.Product
+            info['主板序列号'] = board.SerialNumber
+            info['主板版本'] = board.Version
+    except Exception as e:
+        info['错误'] = f"获取主板信息时出错: {str(e)}"
+    
+    return info
+
+def get_gpu_info():
+    """获取显卡详细信息"""
+    info = {}
+    try:
+        c = get_wmi()
+        
+        gpus = []
+        # 虚拟设备的特征关键词
+        virtual_keywords = ['Oray', 'LuminonCore', 'Twomon', 'Virtual', 'Remote', 'DisplayLink']
+        
+        for gpu in c.Win32_VideoController():
+            # 跳过虚拟设备
+            if any(keyword in gpu.Name for keyword in virtual_keywords):
+                continue
+                
+            gpu_info = {}
+            gpu_info['显卡名称'] = gpu.Name
+            # 处理显存大小，如果为0或无效则显示为"共享显存"
+            if gpu.AdapterRAM and int(gpu.AdapterRAM) > 0:
+                gpu_info['显存大小'] = f"{int(gpu.AdapterRAM) / (1024**3):.2f} GB"
+            else:
+                gpu_info['显存大小'] = "共享显存"
+            gpu_info['驱动版本'] = gpu.DriverVersion
+            gpu_info['显卡厂商'] = gpu.AdapterCompatibility
+            gpus.append(gpu_info)
+        
+        info['显卡数量'] = len(gpus)
+        info['显卡详情'] = gpus
+    except Exception as e:
+        info['错误'] = f"获取显卡信息时出错: {str(e)}"
+    return info